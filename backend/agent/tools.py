@@ -4,16 +4,9 @@ import json
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 
-try:
-    from twilio.rest import Client
-    TWILIO_AVAILABLE = True
-except Exception:
-    Client = None
-    TWILIO_AVAILABLE = False
-    print("Twilio package not installed; Twilio features disabled.")
-
 from models.data_models import VehicleServiceLog, Mechanic
 from services.service import Service
+from services.sms_service import ReminderSender, SmsMessage, get_sms_transport
 from repos.repo import Repo
 from constants import DB_NAME
 
@@ -120,9 +113,9 @@ async def get_vehicles_service_due_soon(days: int = 30) -> Dict:
     Get vehicles that have their next service due soon.
     """
     try:
-        all_logs = await service.get_vehicle_service_logs(None)
+        due_logs = await service.get_vehicles_due_soon(days_threshold=days)
 
-        if not all_logs:
+        if not due_logs:
             return {
                 "message": f"No vehicles have service due in the next {days} days",
                 "success": True,
@@ -132,38 +125,17 @@ async def get_vehicles_service_due_soon(days: int = 30) -> Dict:
         today = datetime.now().date()
         formatted_logs = []
 
-        for log in all_logs:
-            if log.next_service_date:
-                try:
-                    if isinstance(log.next_service_date, str):
-                        next_service = datetime.fromisoformat(log.next_service_date).date()
-                    else:
-                        next_service = log.next_service_date.date()
-
-                    days_until = (next_service - today).days
-
-                    if 0 <= days_until <= days:
-                        formatted_logs.append({
-                            "vehicle_model": log.vehicle_model or "Unknown",
-                            "owner_name": log.owner_name or "Unknown",
-                            "owner_phone_number": log.owner_phone_number or "Unknown",
-                            "next_service_date": next_service.strftime("%Y-%m-%d"),
-                            "days_until_service": days_until,
-                            "last_service_type": log.service_type or "Unknown",
-                            "last_service_date": log.service_date.strftime("%Y-%m-%d") if log.service_date else "Unknown"
-                        })
-                except Exception as e:
-                    print(f"Error processing log {log.id}: {e}")
-                    continue
-
-        if not formatted_logs:
-            return {
-                "message": f"No vehicles have service due in the next {days} days",
-                "success": True,
-                "data": []
-            }
-
-        formatted_logs.sort(key=lambda x: x["days_until_service"])
+        for log in due_logs:
+            next_service = log.next_service_date.date()
+            formatted_logs.append({
+                "vehicle_model": log.vehicle_model or "Unknown",
+                "owner_name": log.owner_name or "Unknown",
+                "owner_phone_number": log.owner_phone_number or "Unknown",
+                "next_service_date": next_service.strftime("%Y-%m-%d"),
+                "days_until_service": (next_service - today).days,
+                "last_service_type": log.service_type or "Unknown",
+                "last_service_date": log.service_date.strftime("%Y-%m-%d") if log.service_date else "Unknown"
+            })
 
         return {
             "message": f"Found {len(formatted_logs)} vehicle(s) with service due in the next {days} days",
@@ -229,43 +201,39 @@ async def get_vehicle_service_logs(vehicle_id: Optional[str] = None) -> dict:
 # Analytics Functions (Challenge 3)
 async def get_total_services_count() -> Dict:
     """Get the total number of services recorded in the database."""
-    all_logs = await service.get_vehicle_service_logs(None)
-    total_count = len(all_logs)
-    return {"message": f"Total services recorded: {total_count}", "count": total_count, "data": all_logs}
+    summary = await service.get_cost_summary()
+    total_count = summary["count"]
+    return {"message": f"Total services recorded: {total_count}", "count": total_count}
 
 
 async def get_average_service_cost() -> Dict:
     """Calculate the average service cost across all recorded services."""
-    all_logs = await service.get_vehicle_service_logs(None)
+    summary = await service.get_cost_summary()
 
-    if not all_logs:
+    if not summary["count"]:
         return {"message": "No services found to calculate average", "average_cost": 0}
 
-    total_cost = sum(log.cost for log in all_logs)
-    average_cost = total_cost / len(all_logs)
+    average_cost = summary["average_cost"]
 
     return {
         "message": f"Average service cost: Rs{average_cost:.2f}",
         "average_cost": round(average_cost, 2),
-        "total_services": len(all_logs),
-        "total_cost": total_cost
+        "total_services": summary["count"],
+        "total_cost": summary["total_cost"]
     }
 
 
 async def get_most_frequent_service_type() -> Dict:
     """Find which service type occurs most frequently in the database."""
-    all_logs = await service.get_vehicle_service_logs(None)
+    stats = await service.get_stats_by("service_type")
 
-    if not all_logs:
+    if not stats:
         return {"message": "No services found", "most_frequent_type": None}
 
-    service_type_counts = {}
-    for log in all_logs:
-        service_type = log.service_type
-        service_type_counts[service_type] = service_type_counts.get(service_type, 0) + 1
+    service_type_counts = {row["key"]: row["count"] for row in stats}
 
-    most_frequent_type = max(service_type_counts, key=service_type_counts.get)
-    frequency = service_type_counts[most_frequent_type]
+    most_frequent_type = stats[0]["key"]
+    frequency = stats[0]["count"]
 
     return {
         "message": f"Most frequent service type: {most_frequent_type} (occurs {frequency} times)",
@@ -345,43 +313,22 @@ async def get_overdue_services() -> Dict:
     Overdue = next_service_date < today.
     """
     try:
-        all_logs = await service.get_vehicle_service_logs(None)
+        overdue = await service.get_overdue_services()
 
-        if not all_logs:
-            return {
-                "message": "No services found in the database",
-                "success": True,
-                "data": []
+        overdue_logs = [
+            {
+                "vehicle_model": log.vehicle_model or "Unknown",
+                "owner_name": log.owner_name or "Unknown",
+                "owner_phone_number": log.owner_phone_number or "Unknown",
+                "next_service_date": log.next_service_date.strftime("%Y-%m-%d"),
+                "last_service_type": log.service_type or "Unknown",
+                "last_service_date": log.service_date.strftime("%Y-%m-%d") if log.service_date else "Unknown",
+                "cost": log.cost,
+                "mileage": log.mileage,
+                "mechanic_name": getattr(log, "mechanic_name", None)
             }
-
-        today = datetime.now().date()
-        overdue_logs = []
-
-        for log in all_logs:
-            if not log.next_service_date:
-                continue
-
-            try:
-                if isinstance(log.next_service_date, str):
-                    next_service = datetime.fromisoformat(log.next_service_date).date()
-                else:
-                    next_service = log.next_service_date.date()
-
-                if next_service < today:
-                    overdue_logs.append({
-                        "vehicle_model": log.vehicle_model or "Unknown",
-                        "owner_name": log.owner_name or "Unknown",
-                        "owner_phone_number": log.owner_phone_number or "Unknown",
-                        "next_service_date": next_service.strftime("%Y-%m-%d"),
-                        "last_service_type": log.service_type or "Unknown",
-                        "last_service_date": log.service_date.strftime("%Y-%m-%d") if log.service_date else "Unknown",
-                        "cost": log.cost,
-                        "mileage": log.mileage,
-                        "mechanic_name": getattr(log, "mechanic_name", None)
-                    })
-            except Exception as e:
-                print(f"Error processing log {getattr(log, 'id', 'unknown')}: {e}")
-                continue
+            for log in overdue
+        ]
 
         if not overdue_logs:
             return {
@@ -390,8 +337,6 @@ async def get_overdue_services() -> Dict:
                 "data": []
             }
 
-        overdue_logs.sort(key=lambda x: x["next_service_date"])
-
         return {
             "message": f"Found {len(overdue_logs)} overdue service(s)",
             "success": True,
@@ -409,9 +354,9 @@ async def get_overdue_services() -> Dict:
 async def get_owner_with_most_services() -> Dict:
     """Find which owner has logged the most vehicle services."""
     try:
-        all_logs = await service.get_vehicle_service_logs(None)
+        stats = await service.get_stats_by("owner_name")
 
-        if not all_logs:
+        if not stats:
             return {
                 "message": "No services found in the database",
                 "success": True,
@@ -419,16 +364,9 @@ async def get_owner_with_most_services() -> Dict:
             }
 
         owner_counts = {}
-        for log in all_logs:
-            owner = log.owner_name or "Unknown Owner"
-            owner_counts[owner] = owner_counts.get(owner, 0) + 1
-
-        if not owner_counts:
-            return {
-                "message": "No owner information found in service logs",
-                "success": True,
-                "top_owner": None
-            }
+        for row in stats:
+            owner = row["key"] or "Unknown Owner"
+            owner_counts[owner] = owner_counts.get(owner, 0) + row["count"]
 
         top_owner = max(owner_counts, key=owner_counts.get)
         service_count = owner_counts[top_owner]
@@ -530,31 +468,19 @@ async def get_mechanic_with_most_services() -> Dict:
     CHANGED: use mechanic_name stored in VehicleServiceLog instead of non-existent mechanic_id.
     """
     try:
-        all_logs = await service.get_vehicle_service_logs(None)
+        stats = await service.get_stats_by("mechanic_name", skip_empty=True)
 
-        if not all_logs:
-            return {
-                "message": "No services found",
-                "success": True,
-                "top_mechanic": None
-            }
-
-        mechanic_counts: Dict[str, int] = {}
-        for log in all_logs:
-            name = getattr(log, "mechanic_name", None)
-            if not name:
-                continue
-            mechanic_counts[name] = mechanic_counts.get(name, 0) + 1
-
-        if not mechanic_counts:
+        if not stats:
             return {
                 "message": "No mechanic information found in service logs",
                 "success": True,
                 "top_mechanic": None
             }
 
-        top_mechanic = max(mechanic_counts, key=mechanic_counts.get)
-        service_count = mechanic_counts[top_mechanic]
+        mechanic_counts: Dict[str, int] = {row["key"]: row["count"] for row in stats}
+
+        top_mechanic = stats[0]["key"]
+        service_count = stats[0]["count"]
 
         return {
             "message": f"{top_mechanic} has completed the most services: {service_count} service(s)",
@@ -578,28 +504,9 @@ async def get_total_cost_by_mechanic() -> Dict:
     CHANGED: group by mechanic_name instead of non-existent mechanic_id.
     """
     try:
-        all_logs = await service.get_vehicle_service_logs(None)
-
-        if not all_logs:
-            return {
-                "message": "No services found",
-                "success": True,
-                "mechanic_costs": {}
-            }
-
-        mechanic_costs: Dict[str, float] = {}
-        mechanic_service_counts: Dict[str, int] = {}
+        stats = await service.get_stats_by("mechanic_name", skip_empty=True)
 
-        for log in all_logs:
-            name = getattr(log, "mechanic_name", None)
-            if not name:
-                continue
-
-            cost = log.cost or 0
-            mechanic_costs[name] = mechanic_costs.get(name, 0) + cost
-            mechanic_service_counts[name] = mechanic_service_counts.get(name, 0) + 1
-
-        if not mechanic_costs:
+        if not stats:
             return {
                 "message": "No mechanic information found in service logs",
                 "success": True,
@@ -609,13 +516,14 @@ async def get_total_cost_by_mechanic() -> Dict:
         mechanic_report = []
         total_revenue = 0.0
 
-        for name, total_cost in mechanic_costs.items():
-            service_count = mechanic_service_counts[name]
+        for row in stats:
+            total_cost = row["total_cost"]
+            service_count = row["count"]
             average_cost = round(total_cost / service_count, 2) if service_count else 0.0
             total_revenue += total_cost
 
             mechanic_report.append({
-                "mechanic_name": name,
+                "mechanic_name": row["key"],
                 "mechanic_id": None,  # no real mechanic_id in logs; kept key for compatibility
                 "total_cost": total_cost,
                 "service_count": service_count,
@@ -790,14 +698,11 @@ async def send_service_reminders(days: int = 7) -> Dict:
                 "data": []
             }
 
-        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-        auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-        from_number = os.getenv("TWILIO_FROM_NUMBER")
-
-        twilio_enabled = TWILIO_AVAILABLE and bool(account_sid and auth_token and from_number)
-        client = Client(account_sid, auth_token) if twilio_enabled else None
+        transport = get_sms_transport()
+        twilio_enabled = transport is not None
 
         reminder_results = []
+        outgoing = []  # (index into reminder_results, message)
 
         for log in due_logs:
             phone = getattr(log, "owner_phone_number", None)
@@ -826,37 +731,38 @@ async def send_service_reminders(days: int = 7) -> Dict:
                 f"Please schedule your visit with the service center."
             )
 
-            send_status = "not_sent_twilio_disabled"
-
-            if twilio_enabled:
-                try:
-                    message = client.messages.create(
-                        body=msg_body,
-                        from_=from_number,
-                        to=phone
-                    )
-                    send_status = "sent" if message.sid else "unknown"
-                except Exception as sms_err:
-                    send_status = f"error_sending: {sms_err}"
-
+            outgoing.append((len(reminder_results), SmsMessage(phone, msg_body)))
             reminder_results.append({
                 "vehicle_model": log.vehicle_model,
                 "owner_name": log.owner_name,
                 "owner_phone_number": phone,
                 "next_service_date": next_date_str,
-                "status": send_status,
+                "status": "not_sent_twilio_disabled",
                 "message_preview": msg_body
             })
 
+        # Sends run concurrently behind a rate limiter with per-message retry
+        if twilio_enabled and outgoing:
+            try:
+                results = await ReminderSender(transport).send_all([message for _, message in outgoing])
+            finally:
+                transport.close()
+            for (index, _), result in zip(outgoing, results):
+                reminder_results[index]["status"] = result.status
+
         summary_sent = sum(1 for r in reminder_results if r["status"] == "sent")
+        summary_fake = sum(1 for r in reminder_results if r["status"] == "sent_fake")
         summary_skipped = sum(1 for r in reminder_results if r["status"] == "skipped_no_phone")
         summary_disabled = sum(1 for r in reminder_results if r["status"] == "not_sent_twilio_disabled")
+        summary_failed = sum(1 for r in reminder_results if r["status"].startswith("error_sending"))
 
         summary_msg = (
             f"Processed {len(reminder_results)} reminder(s) for the next {days} days. "
-            f"Sent: {summary_sent}, Skipped (no phone): {summary_skipped}, "
+            f"Sent: {summary_sent}, Failed: {summary_failed}, Skipped (no phone): {summary_skipped}, "
             f"Not sent (Twilio disabled): {summary_disabled}."
         )
+        if summary_fake:
+            summary_msg += f" Simulated by the fake SMS transport: {summary_fake}."
 
         if not twilio_enabled:
             summary_msg += " Twilio credentials not configured; simulated only."
@@ -0,0 +1,118 @@
+# backend/auth_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from auth_models import User
+from auth_schemas import UserRead
+from constants import AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS
+
+
+class _TTLCache:
+    """Thread-safe LRU with a per-entry absolute (wall clock) deadline."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, deadline: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AuthCache:
+    """
+    Caches decoded access tokens (token -> user id) and user records
+    (user id -> UserRead) so authenticated polling doesn't decode the JWT and
+    query SQLite on every request.
+
+    Token entries never outlive the token's own `exp`. User entries are
+    dropped whenever the users row changes (see the mapper events below),
+    and both expire after AUTH_CACHE_TTL_SECONDS regardless.
+    """
+
+    def __init__(self, max_size: int = AUTH_CACHE_SIZE, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tokens = _TTLCache(max_size)
+        self._users = _TTLCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get_token(self, token: str) -> Optional[int]:
+        return self._tokens.get(token)
+
+    def put_token(self, token: str, user_id: int, exp: Optional[float]) -> None:
+        deadline = time.time() + self.ttl_seconds
+        if exp is not None:
+            deadline = min(deadline, float(exp))
+        self._tokens.put(token, user_id, deadline)
+
+    def get_user(self, user_id: int) -> Optional[UserRead]:
+        user = self._users.get(user_id)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def put_user(self, user: UserRead) -> None:
+        self._users.put(user.id, user, time.time() + self.ttl_seconds)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._users.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Single shared instance
+auth_cache = AuthCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    auth_cache.invalidate_user(target.id)
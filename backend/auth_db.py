@@ -1,23 +1,58 @@
 # backend/auth_db.py
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
-DATABASE_URL = "sqlite:///./vehicle_service_logs.db"
+from constants import (
+    AUTH_DB_MAX_OVERFLOW,
+    AUTH_DB_POOL_RECYCLE_SECONDS,
+    AUTH_DB_POOL_SIZE,
+    AUTH_DB_POOL_TIMEOUT,
+    DB_BUSY_TIMEOUT_MS,
+    DB_NAME,
+)
+
+# Same file as the service-log Repo; both run in WAL mode so readers never
+# block on a writer, and busy_timeout makes the two writers wait instead of
+# failing with "database is locked".
+DATABASE_URL = f"sqlite+aiosqlite:///./{DB_NAME}"
 
-engine = create_engine(
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},  # required for SQLite + FastAPI
+    pool_size=AUTH_DB_POOL_SIZE,
+    max_overflow=AUTH_DB_MAX_OVERFLOW,
+    pool_timeout=AUTH_DB_POOL_TIMEOUT,
+    pool_recycle=AUTH_DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine.sync_engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # Same settings as repos/pool.py connections
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db():
-  db = SessionLocal()
-  try:
+async def init_auth_db():
+  """Make sure auth tables exist in vehicle_service_logs.db."""
+  async with engine.begin() as conn:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_auth_db():
+  await engine.dispose()
+
+
+async def get_db():
+  async with SessionLocal() as db:
     yield db
-  finally:
-    db.close()
@@ -1,17 +1,24 @@
 # backend/auth_security.py
 
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from constants import BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_WORKERS
+
 # TODO: move to env in real deployment
 SECRET_KEY = "change_this_to_a_long_random_secret_string"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are reported by needs_update()/verify_and_update()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # bcrypt hard limit
 MAX_PASSWORD_BYTES = 72
@@ -43,6 +50,85 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify, and if the stored hash uses outdated settings (e.g. another
+    BCRYPT_ROUNDS) also return a fresh hash to store: (valid, new_hash or None).
+    """
+    plain_password = _normalize_password(plain_password)
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# ---------- Async wrappers (dedicated process pool) ----------
+
+class PasswordHasherBusyError(RuntimeError):
+    """Raised when the hashing pool already has its maximum work queued."""
+
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pending = 0
+
+
+def _hash_pool_context():
+    """
+    The pool starts lazily, after aiosqlite, executor and event-loop threads
+    exist; forking a multi-threaded process can deadlock the child, so
+    workers come from a forkserver (spawn where that's unavailable).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+async def _run_in_hash_pool(fn: Callable, *args):
+    """
+    bcrypt is deliberately CPU-heavy (hundreds of ms per call), so it runs in
+    its own process pool rather than the threadpool shared with sync routes.
+    At most PASSWORD_HASH_QUEUE_SIZE calls may be running or waiting; beyond
+    that we fail fast with PasswordHasherBusyError (503) so a login storm
+    can't queue unbounded work.
+    """
+    global _hash_pool, _hash_pending
+    if _hash_pending >= PASSWORD_HASH_QUEUE_SIZE:
+        raise PasswordHasherBusyError("Too many authentication requests in progress, try again shortly")
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=_hash_pool_context())
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool on the next call
+        _hash_pool = None
+        raise
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str,
+) -> Tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_password_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        # Waiting lets the executor's management thread exit before interpreter
+        # teardown; workers are idle at shutdown, so this returns quickly
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
+
 def create_access_token(
     data: dict,
     expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES,
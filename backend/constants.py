@@ -1,3 +1,5 @@
+import os
+
 # Agent details
 AGENT_NAME = "agent"
 AGENT_DESCRIPTION = "An AgenicAI based online app for maintaining a log of servicing done till date for customer vehicles with details and generating reminders for upcoming or any pending service."
@@ -5,4 +7,79 @@ AGENT_MODEL = "gemini-2.5-flash"
 
 # DB Details
 DB_NAME = "vehicle_service_logs.db"
-TABLE_NAME = "vehicle_service_logs"
\ No newline at end of file
+TABLE_NAME = "vehicle_service_logs"
+
+# Connection pool (see repos/pool.py)
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "60"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Rows per executemany call in Repo.insert_many
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
+
+# Streaming CSV/Excel import (services/import_service.py)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+# Background import jobs (services/job_service.py)
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+IMPORT_JOB_QUEUE_SIZE = int(os.getenv("IMPORT_JOB_QUEUE_SIZE", "100"))
+
+# ML cost estimation micro-batching (services/ml_service.py)
+ML_BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "256"))
+ML_BATCH_MAX_WAIT_MS = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "5"))
+ML_MAX_BATCH_REQUEST_ROWS = int(os.getenv("ML_MAX_BATCH_REQUEST_ROWS", "10000"))
+# Log one in N predict calls (details at DEBUG level only)
+ML_LOG_SAMPLE_RATE = int(os.getenv("ML_LOG_SAMPLE_RATE", "100"))
+# Prediction cache; mileage is snapped to buckets of this many km (1 = exact)
+ML_CACHE_SIZE = int(os.getenv("ML_CACHE_SIZE", "10000"))
+ML_CACHE_TTL_SECONDS = float(os.getenv("ML_CACHE_TTL_SECONDS", "3600"))
+ML_CACHE_MILEAGE_BUCKET_KM = int(os.getenv("ML_CACHE_MILEAGE_BUCKET_KM", "1000"))
+# Inference thread pool; requests beyond the queue size get 503
+ML_INFERENCE_WORKERS = int(os.getenv("ML_INFERENCE_WORKERS", "2"))
+ML_INFERENCE_QUEUE_SIZE = int(os.getenv("ML_INFERENCE_QUEUE_SIZE", "64"))
+# Model registry hot reload (services/model_registry.py); 0 disables the watcher
+ML_MODEL_WATCH_INTERVAL = float(os.getenv("ML_MODEL_WATCH_INTERVAL", "10"))
+ML_MODEL_MMAP = os.getenv("ML_MODEL_MMAP", "1") == "1"
+# Serve the array-backed export (services/compact_model.py) instead of the sklearn Pipeline
+ML_COMPACT_MODEL = os.getenv("ML_COMPACT_MODEL", "1") == "1"
+
+# Password hashing (auth_security.py): bcrypt cost and its dedicated process pool.
+# Changing BCRYPT_ROUNDS rehashes each user's password on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+# Authenticated-request cache (auth_cache.py): decoded tokens and user records
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# Shared secret for admin-only routes (X-Admin-Token header); unset disables them
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+# Async SQLAlchemy engine for the auth tables (auth_db.py)
+AUTH_DB_POOL_SIZE = int(os.getenv("AUTH_DB_POOL_SIZE", "5"))
+AUTH_DB_MAX_OVERFLOW = int(os.getenv("AUTH_DB_MAX_OVERFLOW", "5"))
+AUTH_DB_POOL_TIMEOUT = float(os.getenv("AUTH_DB_POOL_TIMEOUT", "30"))
+AUTH_DB_POOL_RECYCLE_SECONDS = int(os.getenv("AUTH_DB_POOL_RECYCLE_SECONDS", "3600"))
+
+# Outbound webhook dispatcher (services/webhook_service.py)
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+# 1 = one event per request; >1 = receiver accepts {"events": [...]} batches of this size
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "1"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_BACKOFF_BASE_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_BASE_SECONDS", "2"))
+WEBHOOK_BACKOFF_MAX_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", "600"))
+WEBHOOK_POLL_INTERVAL_SECONDS = float(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", "5"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "60"))
+
+# SMS service reminders (services/sms_service.py)
+SMS_TRANSPORT = os.getenv("SMS_TRANSPORT", "twilio")  # "twilio" or "fake" (logs, reports "sent_fake")
+SMS_CONCURRENCY = int(os.getenv("SMS_CONCURRENCY", "8"))
+# Token bucket in front of the provider; match the sending number's messages-per-second limit
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "10"))
+SMS_BURST = int(os.getenv("SMS_BURST", "10"))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "3"))
+SMS_BACKOFF_BASE_SECONDS = float(os.getenv("SMS_BACKOFF_BASE_SECONDS", "1"))
@@ -1,17 +1,23 @@
 import os
+from contextlib import asynccontextmanager
 import uvicorn
+from fastapi import Response
 from fastapi.middleware.cors import CORSMiddleware
 from google.adk.cli.fast_api import get_fast_api_app
 from services.service import Service
 from repos.repo import Repo
+from repos.pool import close_all_pools
 from constants import DB_NAME
-from routers import vehicle_service_logs, mechanics, file_upload, voice
-from auth_db import Base as AuthBase, engine as auth_engine
+from routers import vehicle_service_logs, mechanics, file_upload, voice, jobs, webhooks
+from services.job_service import import_jobs
+from services.webhook_service import webhook_dispatcher
+from auth_db import close_auth_db, init_auth_db
+from auth_security import shutdown_password_pool
 from routers.auth import router as auth_router
 from fastapi.staticfiles import StaticFiles
 
-# 🔹 ML: import the ML service so the model loads at startup
-from services.ml_service import ml_service  # <-- ADDED
+# 🔹 ML: the cost model is warmed in the background by the lifespan below
+from services.ml_service import ml_service
 
 
 # ---------- Core setup ----------
@@ -31,9 +37,6 @@ ALLOWED_ORIGINS = [
 
 SERVE_WEB_INTERFACE = True
 
-# Make sure auth tables exist in vehicle_service_logs.db
-AuthBase.metadata.create_all(bind=auth_engine)
-
 # Get the FastAPI app from Google ADK
 # We *won't* rely on its internal CORS; we will add our own middleware.
 app = get_fast_api_app(
@@ -42,6 +45,37 @@ app = get_fast_api_app(
     web=SERVE_WEB_INTERFACE,
 )
 
+# ---------- DB connection pool lifecycle ----------
+
+# ADK builds the app with its own lifespan; wrap it so pooled connections are
+# opened and the schema migrated once on startup, and closed on shutdown.
+_adk_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan(app_):
+    await repo.pool.open()
+    await repo.init_db()
+    await init_auth_db()
+    await import_jobs.start()
+    await webhook_dispatcher.start()
+    # Unpickling the cost model takes seconds; serve CRUD/agent traffic meanwhile
+    ml_service.start_loading()
+    ml_service.start_watcher()
+    try:
+        async with _adk_lifespan(app_) as state:
+            yield state
+    finally:
+        await import_jobs.stop()
+        await webhook_dispatcher.stop()
+        ml_service.shutdown()
+        shutdown_password_pool()
+        await close_auth_db()
+        await close_all_pools()
+
+
+app.router.lifespan_context = lifespan
+
 # ---------- CORS middleware (global) ----------
 
 app.add_middleware(
@@ -50,6 +84,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination cursor for GET /vehicle_service_logs/
 )
 
 # Auth: /auth/register, /auth/login, /auth/me
@@ -71,6 +106,16 @@ app.include_router(
     prefix="/vehicle_service_logs/api/files",
     tags=["files"],
 )
+app.include_router(
+    jobs.router,
+    prefix="/jobs",
+    tags=["jobs"],
+)
+app.include_router(
+    webhooks.router,
+    prefix="/webhooks",
+    tags=["webhooks"],
+)
 app.include_router(
     voice.router,
     prefix="/vehicle_service_logs/api/voice",
@@ -85,9 +130,21 @@ os.makedirs(IMAGE_DIR, exist_ok=True)
 app.mount("/service_images", StaticFiles(directory=IMAGE_DIR), name="service_images")
 
 
-# 🔹 ML: optional sanity log so you know if model is loaded
-if not ml_service.is_ready():  # <-- ADDED
-    print("[ML] Warning: service_cost_model.pkl not loaded. Train or place it under backend/ml/")  # <-- ADDED
+# ---------- Health ----------
+
+@app.get("/health", tags=["health"])
+async def health():
+    """Liveness: the server is up. Includes the ML model warm-up state."""
+    return {"status": "ok", "ml_model": ml_service.status}
+
+
+@app.get("/health/ready", tags=["health"])
+async def health_ready(response: Response):
+    """Readiness: 503 until the cost model has finished warming up."""
+    ready = ml_service.status != "loading"
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "ml_model": ml_service.status}
 
 
 # ---------- Entrypoint ----------
@@ -23,4 +23,26 @@ class VehicleServiceLog(BaseModel):
     cost: float
     next_service_date: Optional[datetime] = None
     # you probably added this:
-    mechanic_name: Optional[str] = None  
+    mechanic_name: Optional[str] = None
+
+
+class ImportJob(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    filename: Optional[str] = None
+    rows_read: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[dict] = []
+    message: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class WebhookMessage(BaseModel):
+    id: int
+    url: str
+    event: str
+    payload: dict
+    attempts: int = 0
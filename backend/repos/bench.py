@@ -0,0 +1,360 @@
+"""
+Benchmarks for the Repo layer, each on a scratch database filled with
+synthetic logs (repos/synthetic.py) and thrown away afterwards.
+
+    pool      requests/sec and latency of a mixed dashboard workload through
+              the connection pool vs. the old connect-per-call Repo
+    due-soon  the reminder scan as date(next_service_date) filters (full
+              scan) vs. the next_service_day range (index range)
+    bulk-insert
+              ml/synthetic_vehicle_service_logs.csv (2000 rows) scaled to
+              --rows, loaded by Repo.insert_many vs. one Repo.insert per row
+    auth-contention
+              concurrent registrations mixed with Repo log inserts on one
+              file: the old sync auth engine (session held across bcrypt)
+              vs. the async engine in auth_db.py
+
+Usage (from backend/):
+    python -m repos.bench pool --rows 20000 --clients 50 --requests 5000
+    python -m repos.bench due-soon                # 1M rows, a few minutes
+    python -m repos.bench bulk-insert             # 1M rows
+    BCRYPT_ROUNDS=4 python -m repos.bench auth-contention --clients 400 --requests 400
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, NamedTuple
+
+import aiosqlite
+
+from constants import DB_NAME, TABLE_NAME
+from repos.pool import close_all_pools
+
+# --rows default per command: the sizes the original requests asked about
+DEFAULT_ROWS: Dict[str, int] = {
+    "pool": 20_000,
+    "due-soon": 1_000_000,
+    "bulk-insert": 1_000_000,
+    "auth-contention": 20_000,
+}
+
+# Output of ml/generate_synthetic_vehicle_logs.py
+SYNTHETIC_CSV = Path(__file__).resolve().parents[2] / "ml" / "synthetic_vehicle_service_logs.csv"
+
+
+class _Run(NamedTuple):
+    latencies: List[float]  # successful requests only
+    errors: Counter
+    elapsed: float
+
+
+def _report(label: str, run: _Run) -> None:
+    latencies = sorted(run.latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)] if latencies else 0.0
+    p50 = statistics.median(latencies) if latencies else 0.0
+    print(
+        f"{label:<20} {len(latencies) / run.elapsed:8.0f} req/s   "
+        f"p50 {p50 * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   errors {sum(run.errors.values())}"
+    )
+    for error, count in run.errors.most_common():
+        print(f"{'':<20} {count} x {error}")
+
+
+async def _drive(clients: int, requests: int, request: Callable[[int], Awaitable]) -> _Run:
+    """Run `requests` calls of request(n) from `clients` concurrent clients."""
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    counter = iter(range(requests))
+
+    async def client() -> None:
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                await request(n)
+            except Exception as e:
+                errors[f"{type(e).__name__}: {e}"] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return _Run(latencies, errors, time.perf_counter() - started)
+
+
+# ---------- pool ----------
+
+class _ConnectPerCall:
+    """The Repo's behaviour before the pool: a new aiosqlite connection (and thread) per call."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with aiosqlite.connect(self.db_path) as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with aiosqlite.connect(self.db_path) as conn:
+            yield conn
+            await conn.commit()
+
+
+async def _bench_pool(db_path: str, rows: int, clients: int, requests: int) -> int:
+    """Same workload, same Repo methods; only where the connections come from differs."""
+    from repos.repo import Repo
+    from repos.synthetic import fill, synthetic_log
+
+    class ConnectPerCallRepo(Repo):
+        @property
+        def pool(self):
+            return baseline
+
+    baseline = _ConnectPerCall(db_path)
+    pooled = Repo(db_path)
+    await pooled.init_db()
+    print(f"Filled {rows} synthetic rows in {await fill(pooled, rows):.1f}s")
+
+    def workload(repo: Repo) -> Callable[[int], Awaitable]:
+        # A dashboard mix: 40% lookups by id, 30% per-vehicle history, 20% pages, 10% writes
+        rng = random.Random(42)
+
+        async def request(n: int):
+            i = rng.randrange(rows)
+            kind = n % 10
+            if kind < 4:
+                return await repo.get(f"bench-{i}")
+            if kind < 7:
+                return await repo.list(f"BENCH-{i // 4}")
+            if kind < 9:
+                return await repo.list_page(limit=50)
+            return await repo.update(synthetic_log(i, rows).model_copy(update={"cost": float(n)}))
+
+        return request
+
+    for label, repo in (("connect-per-call", ConnectPerCallRepo(db_path)), ("pooled", pooled)):
+        _report(label, await _drive(clients, requests, workload(repo)))
+    return 0
+
+
+# ---------- due-soon ----------
+
+async def _timed_query(db: aiosqlite.Connection, sql: str, params: tuple, repeat: int) -> None:
+    cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    plan = "; ".join(row[3] for row in await cursor.fetchall())
+    timings, found = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor = await db.execute(sql, params)
+        found = len(await cursor.fetchall())
+        timings.append(time.perf_counter() - started)
+    print(f"  {statistics.median(timings) * 1000:9.2f} ms  {found} rows  plan: {plan}")
+
+
+async def _bench_due_soon(db_path: str, rows: int, repeat: int = 5) -> int:
+    """The 30-day reminder scan before (migration 6) and after, on the same rows."""
+    from repos.repo import LOG_COLUMNS, Repo
+    from repos.synthetic import START, fill
+
+    repo = Repo(db_path)
+    await repo.init_db()
+    print(f"Filled {rows} synthetic rows in {await fill(repo, rows):.1f}s")
+
+    # A 30-day window in the middle of the synthetic due dates, so it holds
+    # rows whatever --rows is (a window from today could be empty)
+    first = (START + timedelta(hours=rows // 2, days=180)).date()
+    window = (first.isoformat(), (first + timedelta(days=30)).isoformat())
+    async with repo.pool.reader() as db:
+        print("date(next_service_date) filter (before):")
+        await _timed_query(
+            db,
+            f"SELECT {LOG_COLUMNS} FROM {TABLE_NAME} WHERE next_service_date IS NOT NULL "
+            "AND date(next_service_date) >= date(?) AND date(next_service_date) <= date(?)",
+            window,
+            repeat,
+        )
+        print("next_service_day range (after, Repo.get_vehicles_due_soon):")
+        await _timed_query(
+            db,
+            f"SELECT {LOG_COLUMNS} FROM {TABLE_NAME} WHERE next_service_day BETWEEN ? AND ? "
+            "ORDER BY next_service_day",
+            window,
+            repeat,
+        )
+    return 0
+
+
+# ---------- bulk-insert ----------
+
+def _scaled_csv_logs(rows: int) -> Iterator:
+    """The generator's CSV repeated until `rows` logs, each copy with its own ids."""
+    from models.data_models import VehicleServiceLog
+
+    with open(SYNTHETIC_CSV, newline="") as f:
+        sample = [
+            VehicleServiceLog.model_validate({k: v or None for k, v in record.items()})
+            for record in csv.DictReader(f)
+        ]
+    for n in range(rows):
+        log = sample[n % len(sample)]
+        yield log.model_copy(update={"id": f"{log.id}-{n // len(sample)}"})
+
+
+async def _bench_bulk_insert(db_path: str, rows: int, single_rows: int) -> int:
+    from repos.repo import Repo
+
+    repo = Repo(db_path)
+    await repo.init_db()
+
+    # One transaction per row is far too slow for the full size; time a sample
+    started = time.perf_counter()
+    for log in _scaled_csv_logs(single_rows):
+        await repo.insert(log.model_copy(update={"id": f"single-{log.id}"}))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Repo.insert per row     {single_rows / elapsed:9.0f} rows/s "
+        f"({single_rows} rows in {elapsed:.1f}s; {rows} rows would take ~{rows * elapsed / single_rows:.0f}s)"
+    )
+
+    started = time.perf_counter()
+    result = await repo.insert_many(_scaled_csv_logs(rows))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Repo.insert_many        {result['inserted'] / elapsed:9.0f} rows/s "
+        f"({result['inserted']} rows in {elapsed:.1f}s, {len(result['errors'])} errors)"
+    )
+    return 1 if result["errors"] else 0
+
+
+# ---------- auth-contention ----------
+
+async def _bench_auth_contention(db_path: str, rows: int, clients: int, requests: int, timeout: float) -> int:
+    """
+    Even requests register a user, odd ones insert a service log, all on
+    db_path. A request still waiting after `timeout` seconds (a client or
+    proxy giving up) counts as an error.
+    """
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+
+    # Imported after _run has moved into the scratch dir
+    from auth_db import Base, SessionLocal, close_auth_db, init_auth_db
+    from auth_models import User
+    from auth_security import hash_password_async, shutdown_password_pool
+    from repos.repo import Repo
+    from repos.synthetic import fill, synthetic_log
+
+    repo = Repo(db_path)
+    await repo.init_db()
+    print(f"Filled {rows} synthetic rows in {await fill(repo, rows):.1f}s")
+
+    # The auth stack before: sync engine, default pool, session held across bcrypt
+    sync_engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    Base.metadata.create_all(sync_engine)
+
+    async def register_sync(email: str) -> None:
+        db = SyncSession()
+        try:
+            existing = await asyncio.to_thread(lambda: db.scalar(select(User).where(User.email == email)))
+            if existing:
+                raise ValueError("Email already registered")
+            user = User(email=email, hashed_password=await hash_password_async("bench-password"))
+
+            def save():
+                db.add(user)
+                db.commit()
+            await asyncio.to_thread(save)
+        finally:
+            await asyncio.to_thread(db.close)
+
+    async def register_async(email: str) -> None:
+        # The /auth/register flow in routers/auth.py
+        async with SessionLocal() as db:
+            existing = await db.scalar(select(User).where(User.email == email))
+            await db.commit()
+            if existing:
+                raise ValueError("Email already registered")
+            db.add(User(email=email, hashed_password=await hash_password_async("bench-password")))
+            await db.commit()
+
+    def workload(label: str, register: Callable[[str], Awaitable]) -> Callable[[int], Awaitable]:
+        async def request(n: int):
+            if n % 2:
+                log = synthetic_log(rows + n, rows).model_copy(update={"id": f"{label}-{n}"})
+                operation = repo.insert(log)
+            else:
+                operation = register(f"{label}-{n}@bench.example.com")
+            try:
+                return await asyncio.wait_for(operation, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{'log insert' if n % 2 else 'registration'} still waiting after {timeout:g}s")
+
+        return request
+
+    await init_auth_db()
+    try:
+        await hash_password_async("warm-up")  # start the hashing workers outside the timing
+        for label, register in (("sync auth engine", register_sync), ("async auth engine", register_async)):
+            _report(label, await _drive(clients, requests, workload(label.split()[0], register)))
+    finally:
+        await close_auth_db()
+        sync_engine.dispose()
+        shutdown_password_pool()
+    return 0
+
+
+# ---------- CLI ----------
+
+async def _run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="repo_bench_") as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        try:
+            rows = args.rows or DEFAULT_ROWS[args.command]
+            if args.command == "pool":
+                return await _bench_pool(db_path, rows, args.clients, args.requests)
+            if args.command == "due-soon":
+                return await _bench_due_soon(db_path, rows)
+            if args.command == "bulk-insert":
+                return await _bench_bulk_insert(db_path, rows, args.single_rows)
+            if args.command == "auth-contention":
+                # auth_db opens ./vehicle_service_logs.db: point that at the scratch dir
+                cwd = os.getcwd()
+                os.chdir(workdir)
+                try:
+                    return await _bench_auth_contention(
+                        os.path.join(workdir, DB_NAME), rows, args.clients, args.requests, args.timeout
+                    )
+                finally:
+                    os.chdir(cwd)
+            raise ValueError(args.command)
+        finally:
+            await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Repo layer on a scratch database")
+    parser.add_argument("command", choices=sorted(DEFAULT_ROWS))
+    parser.add_argument("--rows", type=int, help="synthetic rows in the scratch table (default per command)")
+    parser.add_argument("--clients", type=int, default=50, help="pool, auth-contention: concurrent clients")
+    parser.add_argument("--requests", type=int, default=5_000, help="pool, auth-contention: requests per mode")
+    parser.add_argument("--single-rows", type=int, default=5_000,
+                        help="bulk-insert: rows timed through one Repo.insert each")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="auth-contention: seconds before a request counts as failed")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
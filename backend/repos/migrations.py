@@ -0,0 +1,286 @@
+from typing import Awaitable, Callable, List, NamedTuple, Set
+
+import aiosqlite
+
+from constants import TABLE_NAME
+from repos.rollups import recreate_rollup_triggers
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[aiosqlite.Connection], Awaitable[None]]
+
+
+async def _columns(db: aiosqlite.Connection, table: str) -> Set[str]:
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in await cursor.fetchall()}
+
+
+# ---------- Migration steps (append only, never reorder) ----------
+
+async def _create_base_tables(db: aiosqlite.Connection) -> None:
+    await db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            id TEXT PRIMARY KEY,
+            owner_name TEXT,
+            owner_phone_number TEXT,
+            vehicle_model TEXT,
+            vehicle_id TEXT,
+            service_date TEXT,
+            service_type TEXT,
+            description TEXT,
+            mileage INTEGER,
+            cost REAL,
+            next_service_date TEXT,
+            mechanic_name TEXT
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS mechanics (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            specialization TEXT,
+            contact_number TEXT,
+            experience_years INTEGER
+        )
+    """)
+
+
+async def _rename_vehicle_type(db: aiosqlite.Connection) -> None:
+    """Old schema used vehicle_type; rename it to vehicle_model."""
+    columns = await _columns(db, TABLE_NAME)
+    if "vehicle_model" not in columns and "vehicle_type" in columns:
+        await db.execute(f"ALTER TABLE {TABLE_NAME} RENAME COLUMN vehicle_type TO vehicle_model")
+
+
+async def _add_owner_phone_number(db: aiosqlite.Connection) -> None:
+    if "owner_phone_number" not in await _columns(db, TABLE_NAME):
+        await db.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN owner_phone_number TEXT")
+
+
+async def _add_mechanic_name(db: aiosqlite.Connection) -> None:
+    if "mechanic_name" not in await _columns(db, TABLE_NAME):
+        await db.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN mechanic_name TEXT")
+
+
+async def _add_service_log_indexes(db: aiosqlite.Connection) -> None:
+    """Secondary indexes for the vehicle lookup, reminder scan and mechanic joins."""
+    for column in ("vehicle_id", "next_service_date", "mechanic_name", "service_date", "vehicle_model"):
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_{column} ON {TABLE_NAME} ({column})"
+        )
+
+
+async def _add_next_service_day(db: aiosqlite.Connection) -> None:
+    """
+    next_service_date holds mixed ISO timestamps (some with offsets), so the
+    reminder queries had to wrap it in date() and could not use an index.
+    Store the normalized day alongside it and index that instead.
+    """
+    if "next_service_day" not in await _columns(db, TABLE_NAME):
+        await db.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN next_service_day TEXT")
+    await db.execute(f"UPDATE {TABLE_NAME} SET next_service_day = date(next_service_date)")
+    await db.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_next_service_day ON {TABLE_NAME} (next_service_day)"
+    )
+    await db.execute(f"DROP INDEX IF EXISTS idx_{TABLE_NAME}_next_service_date")
+
+
+async def _add_service_date_id_index(db: aiosqlite.Connection) -> None:
+    """Composite key for keyset pagination ordered by (service_date, id)."""
+    await db.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_service_date_id ON {TABLE_NAME} (service_date, id)"
+    )
+    await db.execute(f"DROP INDEX IF EXISTS idx_{TABLE_NAME}_service_date")
+
+
+# Migration 8's rollup schema exactly as it first shipped. The live
+# definition in repos/rollups.py changes over time; those changes get their
+# own migrations (12), so a fresh database passes through the same states
+# as one that ran migration 8 back then.
+_V8_ROLLUP_DIMENSIONS = ("service_type", "mechanic_name", "owner_name", "vehicle_model")
+
+
+def _v8_add_row_sql(column: str) -> str:
+    return f"""
+        INSERT INTO service_log_rollups (dimension, key, count, total_cost, last_service_date)
+        VALUES ('{column}', COALESCE(NEW.{column}, ''), 1, COALESCE(NEW.cost, 0), NEW.service_date)
+        ON CONFLICT(dimension, key) DO UPDATE SET
+            count = count + 1,
+            total_cost = total_cost + excluded.total_cost,
+            last_service_date = NULLIF(MAX(COALESCE(last_service_date, ''), COALESCE(excluded.last_service_date, '')), '');
+    """
+
+
+def _v8_remove_row_sql(column: str) -> str:
+    key = f"COALESCE(OLD.{column}, '')"
+    return f"""
+        UPDATE service_log_rollups
+        SET
+            count = count - 1,
+            total_cost = total_cost - COALESCE(OLD.cost, 0),
+            last_service_date = CASE
+                WHEN last_service_date = OLD.service_date THEN (
+                    SELECT MAX(service_date) FROM {TABLE_NAME} WHERE COALESCE({column}, '') = {key}
+                )
+                ELSE last_service_date
+            END
+        WHERE dimension = '{column}' AND key = {key};
+        DELETE FROM service_log_rollups WHERE dimension = '{column}' AND key = {key} AND count <= 0;
+    """
+
+
+async def _add_rollups(db: aiosqlite.Connection) -> None:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS service_log_rollups (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total_cost REAL NOT NULL,
+            last_service_date TEXT,
+            PRIMARY KEY (dimension, key)
+        )
+    """)
+
+    add_new = "".join(_v8_add_row_sql(c) for c in _V8_ROLLUP_DIMENSIONS)
+    remove_old = "".join(_v8_remove_row_sql(c) for c in _V8_ROLLUP_DIMENSIONS)
+    watched = ", ".join(_V8_ROLLUP_DIMENSIONS + ("cost", "service_date"))
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_service_log_rollups_insert
+        AFTER INSERT ON {TABLE_NAME}
+        BEGIN {add_new} END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_service_log_rollups_delete
+        AFTER DELETE ON {TABLE_NAME}
+        BEGIN {remove_old} END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_service_log_rollups_update
+        AFTER UPDATE OF {watched} ON {TABLE_NAME}
+        BEGIN {remove_old} {add_new} END
+    """)
+
+    await db.execute("DELETE FROM service_log_rollups")
+    for column in _V8_ROLLUP_DIMENSIONS:
+        await db.execute(f"""
+            INSERT INTO service_log_rollups (dimension, key, count, total_cost, last_service_date)
+            SELECT '{column}', COALESCE({column}, ''), COUNT(*), COALESCE(SUM(cost), 0), MAX(service_date)
+            FROM {TABLE_NAME}
+            GROUP BY COALESCE({column}, '')
+        """)
+
+
+async def _create_import_jobs(db: aiosqlite.Connection) -> None:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            filename TEXT,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            inserted INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            errors TEXT,
+            message TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def _create_webhook_outbox(db: aiosqlite.Connection) -> None:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            event TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TEXT
+        )
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox (status, next_attempt_at)"
+    )
+
+
+async def _drop_vehicle_model_index(db: aiosqlite.Connection) -> None:
+    """
+    vehicle_model lookups are substring matches (LIKE '%x%'), which always
+    scan the table, so this index was never read and only slowed writes.
+    """
+    await db.execute(f"DROP INDEX IF EXISTS idx_{TABLE_NAME}_vehicle_model")
+
+
+async def _index_rollup_keys(db: aiosqlite.Connection) -> None:
+    """
+    The delete/update triggers recompute last_service_date with a
+    COALESCE(column, '') lookup that no index could serve, so every
+    delete or update scanned the logs table four times. Index those keys
+    and let cost-only updates skip the recompute.
+    """
+    await recreate_rollup_triggers(db)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create vehicle_service_logs and mechanics tables", _create_base_tables),
+    Migration(2, "rename vehicle_type to vehicle_model", _rename_vehicle_type),
+    Migration(3, "add owner_phone_number column", _add_owner_phone_number),
+    Migration(4, "add mechanic_name column", _add_mechanic_name),
+    Migration(5, "add secondary indexes on vehicle_service_logs", _add_service_log_indexes),
+    Migration(6, "add indexed next_service_day for reminder range scans", _add_next_service_day),
+    Migration(7, "replace service_date index with (service_date, id) for keyset pagination", _add_service_date_id_index),
+    Migration(8, "add trigger-maintained analytics rollups", _add_rollups),
+    Migration(9, "create import_jobs table", _create_import_jobs),
+    Migration(10, "create webhook_outbox table", _create_webhook_outbox),
+    Migration(11, "drop unused vehicle_model index", _drop_vehicle_model_index),
+    Migration(12, "index rollup keys and skip date recompute on cost-only updates", _index_rollup_keys),
+]
+
+
+# ---------- Runner ----------
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+
+async def run_migrations(db: aiosqlite.Connection) -> int:
+    """
+    Apply every migration newer than the recorded schema version, in order.
+    Each step is idempotent so databases created before schema_version existed
+    are brought up to date safely. Returns the resulting schema version.
+
+    BEGIN IMMEDIATE takes SQLite's write lock before the version is read, so
+    when several processes start together (uvicorn --workers N) one applies
+    the steps and the rest wait on busy_timeout, then see them already done.
+    The caller's writer() block commits.
+    """
+    if not db.in_transaction:
+        await db.execute("BEGIN IMMEDIATE")
+    current = await get_schema_version(db)
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        await migration.apply(db)
+        await db.execute(
+            "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+            (migration.version, migration.description),
+        )
+        print(f"Database schema migrated to v{migration.version}: {migration.description}")
+        current = migration.version
+    return current
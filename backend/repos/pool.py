@@ -0,0 +1,212 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from constants import (
+    DB_BUSY_TIMEOUT_MS,
+    DB_HEALTH_CHECK_INTERVAL,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    DB_READ_POOL_SIZE,
+)
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when a connection is requested from a pool that has been shut down."""
+
+
+class ConnectionPool:
+    """
+    Long-lived aiosqlite connections for one database file.
+
+    - A bounded set of reader connections shared by SELECT-only queries.
+    - A single writer connection, serialized with a lock, so SQLite never sees
+      two writers at once. Each `writer()` block is one transaction.
+
+    Connections are opened lazily, health-checked when they have been idle for
+    a while, and closed by `close()` (hooked into the FastAPI lifespan).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        read_size: int = DB_READ_POOL_SIZE,
+        acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+        health_check_interval: float = DB_HEALTH_CHECK_INTERVAL,
+    ):
+        if read_size < 1:
+            raise ValueError("read_size must be at least 1")
+        self.db_path = db_path
+        self.read_size = read_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle_readers: Optional[asyncio.Queue] = None
+        self._reader_slots: Optional[asyncio.Semaphore] = None
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._last_used: Dict[int, float] = {}
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock: Optional[asyncio.Lock] = None
+
+        self._closed = False
+
+    # ---------- lifecycle ----------
+
+    async def open(self) -> None:
+        """Eagerly open the writer and one reader (optional; otherwise lazy)."""
+        self._ensure_primitives()
+        async with self._writer_lock:
+            await self._get_writer()
+        async with self.reader():
+            pass
+
+    async def close(self) -> None:
+        """Close every connection. Further borrows raise PoolClosedError."""
+        self._closed = True
+        for conn in self._all_readers:
+            await self._safe_close(conn)
+        self._all_readers.clear()
+        self._last_used.clear()
+        self._idle_readers = None
+        self._reader_slots = None
+
+        if self._writer is not None:
+            await self._safe_close(self._writer)
+            self._writer = None
+        self._writer_lock = None
+
+    # ---------- borrowing ----------
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection for the duration of the block."""
+        self._ensure_primitives()
+        try:
+            await asyncio.wait_for(self._reader_slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for a reader connection to {self.db_path}")
+
+        conn = None
+        try:
+            conn = await self._checkout_reader()
+            yield conn
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                if self._closed:
+                    await self._safe_close(conn)
+                else:
+                    self._idle_readers.put_nowait(conn)
+            if self._reader_slots is not None:
+                self._reader_slots.release()
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrow the single writer connection. The block runs as one transaction:
+        committed on success, rolled back if it raises.
+        """
+        self._ensure_primitives()
+        try:
+            await asyncio.wait_for(self._writer_lock.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for the writer connection to {self.db_path}")
+
+        lock = self._writer_lock
+        try:
+            conn = await self._get_writer()
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+        finally:
+            lock.release()
+
+    # ---------- internals ----------
+
+    def _ensure_primitives(self) -> None:
+        if self._closed:
+            raise PoolClosedError(f"Connection pool for {self.db_path} is closed")
+        if self._idle_readers is None:
+            self._idle_readers = asyncio.Queue()
+            self._reader_slots = asyncio.Semaphore(self.read_size)
+            self._writer_lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        # WAL lets readers proceed while the writer holds its transaction.
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def _checkout_reader(self) -> aiosqlite.Connection:
+        if self._idle_readers.empty():
+            conn = await self._connect()
+            self._all_readers.append(conn)
+            return conn
+
+        conn = self._idle_readers.get_nowait()
+        if await self._is_healthy(conn):
+            return conn
+
+        print(f"[DB] Replacing unhealthy reader connection to {self.db_path}")
+        self._all_readers.remove(conn)
+        self._last_used.pop(id(conn), None)
+        await self._safe_close(conn)
+        conn = await self._connect()
+        self._all_readers.append(conn)
+        return conn
+
+    async def _get_writer(self) -> aiosqlite.Connection:
+        if self._writer is None:
+            self._writer = await self._connect()
+        elif not await self._is_healthy(self._writer):
+            print(f"[DB] Replacing unhealthy writer connection to {self.db_path}")
+            await self._safe_close(self._writer)
+            self._writer = await self._connect()
+        self._last_used[id(self._writer)] = time.monotonic()
+        return self._writer
+
+    async def _is_healthy(self, conn: aiosqlite.Connection) -> bool:
+        """Ping the connection only if it has sat idle past the check interval."""
+        last_used = self._last_used.get(id(conn), 0.0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            await conn.execute("SELECT 1")
+            return True
+        except Exception as e:
+            print(f"[DB] Health check failed: {e}")
+            return False
+
+    @staticmethod
+    async def _safe_close(conn: aiosqlite.Connection) -> None:
+        try:
+            await conn.close()
+        except Exception as e:
+            print(f"[DB] Error closing connection: {e}")
+
+
+# One pool per database file, shared by every Repo pointing at it
+_pools: Dict[str, ConnectionPool] = {}
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    pool = _pools.get(db_path)
+    if pool is None or pool._closed:
+        pool = ConnectionPool(db_path)
+        _pools[db_path] = pool
+    return pool
+
+
+async def close_all_pools() -> None:
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
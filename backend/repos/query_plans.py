@@ -0,0 +1,255 @@
+"""
+Query-plan check for the Repo.
+
+Runs every Repo query against a scratch database, records the SQL it
+actually sends (with parameters bound) and asserts on SQLite's EXPLAIN
+QUERY PLAN: full-table SCANs are only allowed where listed below with a
+reason, and the hot lookups must use their intended index. Any index that
+no checked query uses is reported too, since it only adds write cost.
+
+By default the scratch database is a fresh schema filled with --rows
+synthetic logs (repos/synthetic.py) and ANALYZEd, so the planner chooses
+with production-sized statistics. --rows 0 checks a copy of --db instead.
+A checked query that runs past QUERY_STEP_BUDGET is interrupted once its
+SQL has been captured; the plan is all that is needed.
+
+Usage (from backend/):
+    python -m repos.query_plans                  # 1M synthetic rows, a few minutes
+    python -m repos.query_plans --rows 100000 -v
+    python -m repos.query_plans --rows 0 --db other.db
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import aiosqlite
+
+from constants import DB_NAME, TABLE_NAME
+from models.data_models import Mechanic, VehicleServiceLog
+from repos.rollups import ROLLUP_DIMENSIONS, ROLLUP_TABLE, last_service_date_sql
+
+SQL_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+DEFAULT_ROWS = 1_000_000
+# Progress handler calls (every PROGRESS_INTERVAL VM steps) a check may use
+PROGRESS_INTERVAL = 10_000
+QUERY_STEP_BUDGET = 1_000
+# Tables owned by Repo (the auth tables belong to the SQLAlchemy layer)
+REPO_TABLES = (TABLE_NAME, "mechanics", ROLLUP_TABLE, "import_jobs", "webhook_outbox")
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    call: Callable[..., Awaitable]  # called with the Repo
+    uses_index: Optional[str] = None
+    # table or alias -> why a full scan of it is acceptable
+    allowed_scans: Dict[str, str] = {}
+
+
+def _sample_log() -> VehicleServiceLog:
+    return VehicleServiceLog(
+        id="plan-check-log",
+        vehicle_model="Plan Check Model",
+        owner_name="Plan Check Owner",
+        vehicle_id="PLAN-1",
+        service_date=datetime(2024, 1, 1),
+        service_type="Oil Change",
+        cost=100.0,
+        next_service_date=datetime(2024, 7, 1),
+        mechanic_name="Plan Check Mechanic",
+    )
+
+
+async def _rollup_key_lookup(repo, column: str) -> None:
+    """The last_service_date recompute the delete/update triggers run (not visible to tracing)."""
+    async with repo.pool.reader() as db:
+        await db.execute(last_service_date_sql(column, "'Plan Check'"))
+
+
+SUBSTRING_MATCH = "vehicle_model is a substring (LIKE '%x%') match for the agent tools; no index can serve it"
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck("insert", lambda r: r.insert(_sample_log())),
+    PlanCheck("get", lambda r: r.get("plan-check-log"), f"sqlite_autoindex_{TABLE_NAME}_1"),
+    PlanCheck("list", lambda r: r.list(), allowed_scans={TABLE_NAME: "unfiltered listing of every log"}),
+    PlanCheck("list(vehicle_id)", lambda r: r.list("PLAN-1"), f"idx_{TABLE_NAME}_vehicle_id"),
+    PlanCheck(
+        "list_page(after)",
+        lambda r: r.list_page(after=("2024-01-01T00:00:00", "x"), limit=10),
+        f"idx_{TABLE_NAME}_service_date_id",
+    ),
+    PlanCheck(
+        "list_page(vehicle_id, after)",
+        lambda r: r.list_page("PLAN-1", ("2024-01-01T00:00:00", "x"), 10),
+        f"idx_{TABLE_NAME}_vehicle_id",
+    ),
+    PlanCheck("list_by_vehicle_model", lambda r: r.list_by_vehicle_model("Plan"),
+              allowed_scans={TABLE_NAME: SUBSTRING_MATCH}),
+    PlanCheck("get_vehicles_due_soon", lambda r: r.get_vehicles_due_soon(30), f"idx_{TABLE_NAME}_next_service_day"),
+    PlanCheck("get_overdue_services", lambda r: r.get_overdue_services(), f"idx_{TABLE_NAME}_next_service_day"),
+    PlanCheck("update", lambda r: r.update(_sample_log()), f"sqlite_autoindex_{TABLE_NAME}_1"),
+    PlanCheck("update_service_cost_by_model", lambda r: r.update_service_cost_by_model("Plan", 120.0),
+              allowed_scans={TABLE_NAME: SUBSTRING_MATCH}),
+    PlanCheck("get_cost_summary", lambda r: r.get_cost_summary(), f"sqlite_autoindex_{ROLLUP_TABLE}_1"),
+    PlanCheck("get_stats_by", lambda r: r.get_stats_by("mechanic_name"), f"sqlite_autoindex_{ROLLUP_TABLE}_1"),
+    PlanCheck("create_job", lambda r: r.create_job("plan-check-job", "file_import", None)),
+    PlanCheck("update_job", lambda r: r.update_job("plan-check-job", status="running"),
+              "sqlite_autoindex_import_jobs_1"),
+    PlanCheck("get_job", lambda r: r.get_job("plan-check-job"), "sqlite_autoindex_import_jobs_1"),
+    PlanCheck("fail_unfinished_jobs", lambda r: r.fail_unfinished_jobs("plan check"),
+              allowed_scans={"import_jobs": "runs once at startup"}),
+    PlanCheck("enqueue_webhook", lambda r: r.enqueue_webhook("http://localhost/plan", "plan_check", {})),
+    PlanCheck("claim_due_webhooks", lambda r: r.claim_due_webhooks(10, 60), "idx_webhook_outbox_due"),
+    PlanCheck("mark_webhooks_delivered", lambda r: r.mark_webhooks_delivered([1, 2])),
+    PlanCheck("mark_webhooks_failed", lambda r: r.mark_webhooks_failed([1, 2], "plan check", None)),
+    PlanCheck("count_webhooks_by_status", lambda r: r.count_webhooks_by_status(),
+              allowed_scans={"webhook_outbox": "metrics endpoint; reads the covering (status, ...) index"}),
+    PlanCheck("create_mechanic", lambda r: r.create_mechanic(
+        Mechanic(id="plan-check-mechanic", name="Plan Check Mechanic", specialization="x",
+                 contact_number="0", experience_years=1))),
+    PlanCheck("get_mechanic", lambda r: r.get_mechanic("plan-check-mechanic"), "sqlite_autoindex_mechanics_1"),
+    PlanCheck("list_mechanics", lambda r: r.list_mechanics(), allowed_scans={"mechanics": "unfiltered listing"}),
+    PlanCheck("get_mechanic_with_most_services", lambda r: r.get_mechanic_with_most_services(),
+              f"idx_{TABLE_NAME}_mechanic_name", {"m": "aggregates over every mechanic"}),
+    PlanCheck("get_mechanic_service_costs", lambda r: r.get_mechanic_service_costs(),
+              f"idx_{TABLE_NAME}_mechanic_name", {"m": "aggregates over every mechanic"}),
+    PlanCheck("delete", lambda r: r.delete("plan-check-log"), f"sqlite_autoindex_{TABLE_NAME}_1"),
+    PlanCheck("delete_by_vehicle_model", lambda r: r.delete_by_vehicle_model("Plan"),
+              allowed_scans={TABLE_NAME: SUBSTRING_MATCH}),
+    PlanCheck("delete_mechanic", lambda r: r.delete_mechanic("plan-check-mechanic"), "sqlite_autoindex_mechanics_1"),
+    *(
+        PlanCheck(f"rollup trigger lookup ({column})", lambda r, c=column: _rollup_key_lookup(r, c),
+                  f"idx_{TABLE_NAME}_{column}_rollup_key")
+        for column in ROLLUP_DIMENSIONS
+    ),
+]
+
+
+async def _unused_indexes(db: aiosqlite.Connection, used: str) -> List[str]:
+    placeholders = ", ".join("?" for _ in REPO_TABLES)
+    cursor = await db.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({placeholders}) ORDER BY name",
+        REPO_TABLES,
+    )
+    return [row[0] for row in await cursor.fetchall() if row[0] not in used]
+
+
+async def _explain(db: aiosqlite.Connection, sql: str) -> List[str]:
+    cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}")
+    return [row[3] for row in await cursor.fetchall()]
+
+
+def _problems(check: PlanCheck, plans: List[List[str]]) -> List[str]:
+    problems = []
+    details = [detail for plan in plans for detail in plan]
+    for detail in details:
+        if detail == "SCAN CONSTANT ROW":
+            continue  # no table involved, e.g. the pool's idle health check (SELECT 1)
+        if detail.startswith("SCAN ") and detail.split()[1] not in check.allowed_scans:
+            problems.append(f"full scan: {detail}")
+    if check.uses_index and not any(check.uses_index in detail for detail in details):
+        problems.append(f"expected index {check.uses_index} is not used")
+    return problems
+
+
+async def run_checks(db_path: str, verbose: bool = False, rows: int = DEFAULT_ROWS) -> int:
+    """
+    Run CHECKS against `rows` synthetic logs, or a scratch copy of `db_path`
+    when rows is 0. Returns the number of failures.
+    """
+    # Imported here so the module stays importable from migrations without a cycle
+    from repos.repo import Repo
+    from repos.pool import close_all_pools
+    from repos.synthetic import fill
+
+    with tempfile.TemporaryDirectory(prefix="query_plans_") as workdir:
+        scratch = os.path.join(workdir, os.path.basename(db_path))
+        if not rows and os.path.exists(db_path):
+            shutil.copy(db_path, scratch)
+
+        repo = Repo(scratch)
+        pool = repo.pool
+        statements: List[str] = []
+        tracing = False
+        steps = 0
+
+        def trace(sql: str) -> None:
+            if tracing:
+                statements.append(sql)
+
+        def step_budget() -> int:
+            nonlocal steps
+            steps += 1
+            return int(tracing and steps > QUERY_STEP_BUDGET)  # non-zero interrupts the query
+
+        connect = pool._connect
+
+        async def traced_connect() -> aiosqlite.Connection:
+            conn = await connect()
+            await conn.set_trace_callback(trace)
+            await conn.set_progress_handler(step_budget, PROGRESS_INTERVAL)
+            return conn
+
+        pool._connect = traced_connect
+        failures = 0
+        seen_plans: List[str] = []
+        try:
+            await repo.init_db()
+            async with aiosqlite.connect(scratch) as explain_db:
+                if rows:
+                    print(f"Filled {rows} synthetic rows in {await fill(repo, rows):.1f}s")
+                    await explain_db.execute("ANALYZE")
+                    await explain_db.commit()
+
+                for check in CHECKS:
+                    statements.clear()
+                    steps = 0
+                    tracing, note = True, ""
+                    try:
+                        await check.call(repo)
+                    except sqlite3.OperationalError as e:
+                        if "interrupted" not in str(e):
+                            raise
+                        note = " (interrupted over the step budget)"
+                    finally:
+                        tracing = False
+                    queries = [s for s in statements if s.lstrip().upper().startswith(SQL_PREFIXES)]
+                    plans = [await _explain(explain_db, sql) for sql in queries]
+                    problems = _problems(check, plans)
+                    seen_plans.extend(detail for plan in plans for detail in plan)
+                    failures += bool(problems)
+                    print(f"{'FAIL' if problems else 'ok  '} {check.name}{note}")
+                    for problem in problems:
+                        print(f"       {problem}")
+                    if verbose or problems:
+                        for plan in plans:
+                            for detail in plan:
+                                print(f"       | {detail}")
+
+                for index in await _unused_indexes(explain_db, "\n".join(seen_plans)):
+                    failures += 1
+                    print(f"FAIL index {index} is not used by any checked query")
+        finally:
+            await close_all_pools()
+
+    print(f"{failures} query plan problem(s) found")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert index use for every Repo query")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite database to copy for the check (with --rows 0)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help="synthetic rows to fill the scratch database with; 0 copies --db instead")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+    raise SystemExit(1 if asyncio.run(run_checks(args.db, args.verbose, args.rows)) else 0)
+
+
+if __name__ == "__main__":
+    main()
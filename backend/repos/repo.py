@@ -1,117 +1,178 @@
-from datetime import datetime
-import aiosqlite
-from typing import List, Optional
-from models.data_models import VehicleServiceLog, Mechanic
-from constants import DB_NAME, TABLE_NAME
+from datetime import date, datetime, timedelta, timezone
+import json
+import sqlite3
+import time
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from models.data_models import ImportJob, VehicleServiceLog, Mechanic, WebhookMessage
+from constants import BULK_INSERT_BATCH_SIZE, DB_NAME, TABLE_NAME
+from repos.pool import ConnectionPool, get_pool
+from repos.migrations import run_migrations
+from repos.rollups import ROLLUP_DIMENSIONS, ROLLUP_TABLE, check_rollups, rebuild_rollups
 from uuid import uuid4
 import datetime as dt  # you had this; leaving it
 
+LOG_COLUMNS = """
+    id,
+    owner_name,
+    owner_phone_number,
+    vehicle_model,
+    vehicle_id,
+    service_date,
+    service_type,
+    description,
+    mileage,
+    cost,
+    next_service_date,
+    mechanic_name
+"""
 
-class Repo:
-    def __init__(self, db_path: str = DB_NAME):
-        self.db_path = db_path
 
-    async def init_db(self):
-        """Initialize tables if not exists and handle schema migration."""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Vehicle service logs table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS vehicle_service_logs (
-                    id TEXT PRIMARY KEY,
-                    owner_name TEXT,
-                    owner_phone_number TEXT,
-                    vehicle_model TEXT,
-                    vehicle_id TEXT,
-                    service_date TEXT,
-                    service_type TEXT,
-                    description TEXT,
-                    mileage INTEGER,
-                    cost REAL,
-                    next_service_date TEXT,
-                    mechanic_name TEXT
-                )
-            """)
+def row_to_log(row) -> VehicleServiceLog:
+    """Build a VehicleServiceLog from a row selected with LOG_COLUMNS."""
+    return VehicleServiceLog(
+        id=row[0],
+        owner_name=row[1],
+        owner_phone_number=row[2],
+        vehicle_model=row[3],
+        vehicle_id=row[4],
+        service_date=datetime.fromisoformat(row[5]),
+        service_type=row[6],
+        description=row[7],
+        mileage=row[8],
+        cost=row[9],
+        next_service_date=datetime.fromisoformat(row[10]) if row[10] else None,
+        mechanic_name=row[11]
+    )
 
-            # Mechanics table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS mechanics (
-                    id TEXT PRIMARY KEY,
-                    name TEXT,
-                    specialization TEXT,
-                    contact_number TEXT,
-                    experience_years INTEGER
-                )
-            """)
 
-            # Check if we need to migrate from old schema (vehicle_type → vehicle_model)
-            try:
-                # Try to query the vehicle_model column
-                await db.execute("SELECT vehicle_model FROM vehicle_service_logs LIMIT 1")
-            except aiosqlite.OperationalError:
-                # If vehicle_model doesn't exist, we need to migrate
-                try:
-                    # Check if old vehicle_type column exists
-                    await db.execute("SELECT vehicle_type FROM vehicle_service_logs LIMIT 1")
-                    # If we get here, vehicle_type exists - migrate to vehicle_model
-                    await db.execute("ALTER TABLE vehicle_service_logs RENAME COLUMN vehicle_type TO vehicle_model")
-                    print("Database schema migrated: vehicle_type → vehicle_model")
-                except aiosqlite.OperationalError:
-                    # Neither column exists in old format, table is empty or newly created
-                    pass
-
-            # Migration: add owner_phone_number if missing
-            try:
-                await db.execute("SELECT owner_phone_number FROM vehicle_service_logs LIMIT 1")
-            except aiosqlite.OperationalError:
-                await db.execute("ALTER TABLE vehicle_service_logs ADD COLUMN owner_phone_number TEXT")
-                print("Database schema migrated: added owner_phone_number column")
+INSERT_LOG_SQL = f"""
+    INSERT INTO {TABLE_NAME} (
+        id,
+        owner_name,
+        owner_phone_number,
+        vehicle_model,
+        vehicle_id,
+        service_date,
+        service_type,
+        description,
+        mileage,
+        cost,
+        next_service_date,
+        mechanic_name,
+        next_service_day
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-            # Migration: add mechanic_name if missing (for older DBs)  # <-- CHANGED: new migration block
-            try:
-                await db.execute("SELECT mechanic_name FROM vehicle_service_logs LIMIT 1")
-            except aiosqlite.OperationalError:
-                await db.execute("ALTER TABLE vehicle_service_logs ADD COLUMN mechanic_name TEXT")
-                print("Database schema migrated: added mechanic_name column")  # <-- CHANGED
 
-            await db.commit()
+def insert_params(log: VehicleServiceLog) -> tuple:
+    """Positional parameters for INSERT_LOG_SQL."""
+    return (
+        log.id,
+        log.owner_name,
+        log.owner_phone_number,
+        log.vehicle_model,
+        log.vehicle_id,
+        log.service_date.isoformat(),
+        log.service_type,
+        log.description,
+        log.mileage,
+        log.cost,
+        log.next_service_date.isoformat() if log.next_service_date else None,
+        log.mechanic_name,
+        service_day(log.next_service_date)
+    )
+
+
+def service_day(value: Optional[datetime]) -> Optional[str]:
+    """
+    Normalized 'YYYY-MM-DD' key for a service date, matching SQLite's date()
+    (aware datetimes are converted to UTC first). Stored alongside the raw
+    timestamp so range filters can use an index.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date().isoformat()
+
+
+class Repo:
+    def __init__(self, db_path: str = DB_NAME):
+        self.db_path = db_path
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Shared connection pool for this database file."""
+        return get_pool(self.db_path)
+
+    async def init_db(self) -> int:
+        """
+        Bring the schema up to date via the versioned migration runner.
+        Call once at application startup, not per request.
+        """
+        async with self.pool.writer() as db:
+            return await run_migrations(db)
 
     async def insert(self, log: VehicleServiceLog) -> VehicleServiceLog:  # <-- CHANGED: explicit return type
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             if log.id is None:
                 log.id = str(uuid4())
-            await db.execute(f"""
-                INSERT INTO {TABLE_NAME} (
-                    id,
-                    owner_name,
-                    owner_phone_number,
-                    vehicle_model,
-                    vehicle_id,
-                    service_date,
-                    service_type,
-                    description,
-                    mileage,
-                    cost,
-                    next_service_date,
-                    mechanic_name
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                log.id,
-                log.owner_name,
-                log.owner_phone_number,
-                log.vehicle_model,
-                log.vehicle_id,
-                log.service_date.isoformat(),
-                log.service_type,
-                log.description,
-                log.mileage,
-                log.cost,
-                log.next_service_date.isoformat() if log.next_service_date else None,
-                log.mechanic_name
-            ))
-            await db.commit()
+            await db.execute(INSERT_LOG_SQL, insert_params(log))
             return log  # <-- CHANGED: return the created log so Service / FastAPI can respond
 
+    async def insert_many(
+        self,
+        logs: Iterable[VehicleServiceLog],
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+    ) -> dict:
+        """
+        Insert many logs in a single transaction, `batch_size` rows per
+        executemany call. If a batch hits a constraint error it is retried
+        row by row inside a savepoint, so one bad row doesn't sink the others.
+
+        Returns {"inserted": n, "errors": [{"index": i, "id": ..., "error": ...}]}
+        where `index` is the position in `logs`.
+        """
+        inserted = 0
+        errors: List[dict] = []
+
+        async def flush(batch: List[Tuple[int, tuple]]) -> None:
+            nonlocal inserted
+            await db.execute("SAVEPOINT bulk_batch")
+            try:
+                await db.executemany(INSERT_LOG_SQL, [params for _, params in batch])
+                await db.execute("RELEASE SAVEPOINT bulk_batch")
+                inserted += len(batch)
+                return
+            except sqlite3.DatabaseError:
+                await db.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+                await db.execute("RELEASE SAVEPOINT bulk_batch")
+
+            for index, params in batch:
+                try:
+                    await db.execute(INSERT_LOG_SQL, params)
+                    inserted += 1
+                except sqlite3.DatabaseError as e:
+                    errors.append({"index": index, "id": params[0], "error": str(e)})
+
+        async with self.pool.writer() as db:
+            # Open the transaction explicitly so releasing a savepoint never commits early
+            if not db.in_transaction:
+                await db.execute("BEGIN")
+            batch: List[Tuple[int, tuple]] = []
+            for index, log in enumerate(logs):
+                if log.id is None:
+                    log.id = str(uuid4())
+                batch.append((index, insert_params(log)))
+                if len(batch) >= batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+
+        return {"inserted": inserted, "errors": errors}
+
     async def get(self, log_id: str) -> Optional[VehicleServiceLog]:
         query = f"""
             SELECT
@@ -130,7 +191,7 @@ class Repo:
             FROM {TABLE_NAME}
             WHERE id = ?
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute(query, (log_id,))
             row = await cursor.fetchone()
             if row:
@@ -151,7 +212,7 @@ class Repo:
             return None
 
     async def list(self, vehicle_id: Optional[str] = None) -> List[VehicleServiceLog]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             query = f"""
                 SELECT
                     id,
@@ -193,9 +254,61 @@ class Repo:
                 for row in rows
             ]
 
+    async def list_page(
+        self,
+        vehicle_id: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 100,
+    ) -> Tuple[List[VehicleServiceLog], Optional[Tuple[str, str]]]:
+        """
+        Keyset-paginated listing ordered by (service_date, id).
+
+        `after` is the (service_date, id) key of the last row already seen.
+        Returns the page and the key to pass as `after` for the next page,
+        or None when there are no more rows.
+        """
+        conditions = []
+        params: list = []
+        if vehicle_id:
+            conditions.append("vehicle_id = ?")
+            params.append(vehicle_id)
+        if after:
+            conditions.append("(service_date, id) > (?, ?)")
+            params.extend(after)
+
+        query = f"SELECT {LOG_COLUMNS} FROM {TABLE_NAME}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY service_date, id LIMIT ?"
+        params.append(limit)
+
+        async with self.pool.reader() as db:
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+
+        next_after = (rows[-1][5], rows[-1][0]) if len(rows) == limit else None
+        return [row_to_log(row) for row in rows], next_after
+
+    async def iter_logs(
+        self,
+        vehicle_id: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[VehicleServiceLog]:
+        """
+        Yield logs in (service_date, id) order one keyset page at a time, so
+        memory stays bounded and no connection is held between batches.
+        """
+        while True:
+            logs, after = await self.list_page(vehicle_id, after, batch_size)
+            for log in logs:
+                yield log
+            if after is None:
+                return
+
     async def list_by_vehicle_model(self, vehicle_model: str) -> List[VehicleServiceLog]:
         """List all services for a specific vehicle model"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             query = f"""
                 SELECT
                     id,
@@ -235,96 +348,70 @@ class Repo:
 
     async def get_vehicles_due_soon(self, days_threshold: int = 30) -> List[VehicleServiceLog]:
         """Get vehicles with next service due within specified days"""
-        try:
-            from datetime import datetime, timedelta
-
-            # Calculate future date
-            today = datetime.now().date()
-            future_date = (today + timedelta(days=days_threshold)).isoformat()
-
-            async with aiosqlite.connect(self.db_path) as db:
-                query = f"""
-                    SELECT
-                        id,
-                        owner_name,
-                        owner_phone_number,
-                        vehicle_model,
-                        vehicle_id,
-                        service_date,
-                        service_type,
-                        description,
-                        mileage,
-                        cost,
-                        next_service_date,
-                        mechanic_name
-                    FROM {TABLE_NAME}
-                    WHERE next_service_date IS NOT NULL 
-                    AND date(next_service_date) <= date(?)
-                    AND date(next_service_date) >= date(?)
-                """
+        today = date.today()
+        future_date = today + timedelta(days=days_threshold)
+        return await self._list_by_next_service_day(
+            "next_service_day BETWEEN ? AND ?",
+            (today.isoformat(), future_date.isoformat()),
+        )
+
+    async def get_overdue_services(self) -> List[VehicleServiceLog]:
+        """Get services whose next service date is already in the past"""
+        return await self._list_by_next_service_day(
+            "next_service_day < ?",
+            (date.today().isoformat(),),
+        )
 
-                cursor = await db.execute(query, (future_date, today.isoformat()))
+    async def _list_by_next_service_day(self, condition: str, params: tuple) -> List[VehicleServiceLog]:
+        """Range scan over the indexed next_service_day column, ordered by due date."""
+        try:
+            async with self.pool.reader() as db:
+                cursor = await db.execute(
+                    f"SELECT {LOG_COLUMNS} FROM {TABLE_NAME} WHERE {condition} ORDER BY next_service_day",
+                    params,
+                )
                 rows = await cursor.fetchall()
 
-                logs = []
-                for row in rows:
-                    try:
-                        log = VehicleServiceLog(
-                            id=row[0],
-                            owner_name=row[1],
-                            owner_phone_number=row[2],
-                            vehicle_model=row[3],
-                            vehicle_id=row[4],
-                            service_date=datetime.fromisoformat(row[5]),
-                            service_type=row[6],
-                            description=row[7],
-                            mileage=row[8],
-                            cost=row[9],
-                            next_service_date=datetime.fromisoformat(row[10]) if row[10] else None,
-                            mechanic_name=row[11]
-                        )
-                        logs.append(log)
-                    except Exception as e:
-                        print(f"Error parsing log {row[0]}: {e}")
-                        continue
-
-                return logs
+            logs = []
+            for row in rows:
+                try:
+                    logs.append(row_to_log(row))
+                except Exception as e:
+                    print(f"Error parsing log {row[0]}: {e}")
+            return logs
 
         except Exception as e:
-            print(f"Error in get_vehicles_due_soon: {e}")
+            print(f"Error in _list_by_next_service_day: {e}")
             return []
 
     async def update_service_cost_by_model(self, vehicle_model: str, new_cost: float) -> bool:
         """Update service cost for all logs of a specific vehicle model"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute(
                 f"UPDATE {TABLE_NAME} SET cost = ? WHERE vehicle_model LIKE ?",
                 (new_cost, f"%{vehicle_model}%")
             )
-            await db.commit()
             return cursor.rowcount > 0
 
     async def delete_by_vehicle_model(self, vehicle_model: str) -> bool:
         """Delete all logs for a specific vehicle model"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute(
                 f"DELETE FROM {TABLE_NAME} WHERE vehicle_model LIKE ?",
                 (f"%{vehicle_model}%",)
             )
-            await db.commit()
             return cursor.rowcount > 0
 
     async def delete(self, log_id: str) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute(
                 f"DELETE FROM {TABLE_NAME} WHERE id = ?",
                 (log_id,)
             )
-            await db.commit()
             return cursor.rowcount
 
     async def update(self, log: VehicleServiceLog) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute(f"""
                 UPDATE {TABLE_NAME}
                 SET
@@ -338,7 +425,8 @@ class Repo:
                     mileage = ?,
                     cost = ?,
                     next_service_date = ?,
-                    mechanic_name = ?
+                    mechanic_name = ?,
+                    next_service_day = ?
                 WHERE id = ?
             """, (
                 log.owner_name,
@@ -352,14 +440,217 @@ class Repo:
                 log.cost,
                 log.next_service_date.isoformat() if log.next_service_date else None,
                 log.mechanic_name,
+                service_day(log.next_service_date),
                 log.id
             ))
-            await db.commit()
             return cursor.rowcount > 0
 
+    # Aggregations (served from the trigger-maintained rollup table, see repos/rollups.py)
+    GROUPABLE_COLUMNS = ROLLUP_DIMENSIONS
+
+    async def get_cost_summary(self) -> dict:
+        """Total number of services plus total and average cost."""
+        async with self.pool.reader() as db:
+            # Every log contributes exactly once to each dimension, so any one sums to the total
+            cursor = await db.execute(
+                f"SELECT COALESCE(SUM(count), 0), COALESCE(SUM(total_cost), 0) "
+                f"FROM {ROLLUP_TABLE} WHERE dimension = 'service_type'"
+            )
+            count, total_cost = await cursor.fetchone()
+        return {
+            "count": count,
+            "total_cost": total_cost,
+            "average_cost": total_cost / count if count else 0,
+        }
+
+    async def get_stats_by(self, column: str, skip_empty: bool = False) -> List[dict]:
+        """
+        Service count, total cost and last service date per distinct value of
+        `column`, most frequent first. `column` must be one of GROUPABLE_COLUMNS.
+        Missing values are reported with key None.
+        """
+        if column not in self.GROUPABLE_COLUMNS:
+            raise ValueError(f"Cannot group service logs by {column!r}")
+
+        query = f"SELECT key, count, total_cost, last_service_date FROM {ROLLUP_TABLE} WHERE dimension = ?"
+        if skip_empty:
+            query += " AND key != ''"
+        query += " ORDER BY count DESC, key"
+
+        async with self.pool.reader() as db:
+            cursor = await db.execute(query, (column,))
+            rows = await cursor.fetchall()
+        return [
+            {"key": row[0] or None, "count": row[1], "total_cost": row[2], "last_service_date": row[3]}
+            for row in rows
+        ]
+
+    async def rebuild_rollups(self) -> int:
+        """Recompute the rollup table from scratch."""
+        async with self.pool.writer() as db:
+            return await rebuild_rollups(db)
+
+    async def check_rollups(self) -> List[dict]:
+        """List rollup rows that disagree with the logs table."""
+        # Take the writer so both sides are read from one consistent state
+        async with self.pool.writer() as db:
+            return await check_rollups(db)
+
+    # Import job methods
+    JOB_UPDATABLE_COLUMNS = ("status", "rows_read", "inserted", "failed", "errors", "message")
+
+    async def create_job(self, job_id: str, kind: str, filename: Optional[str]) -> ImportJob:
+        async with self.pool.writer() as db:
+            await db.execute(
+                "INSERT INTO import_jobs (id, kind, status, filename) VALUES (?, ?, 'queued', ?)",
+                (job_id, kind, filename)
+            )
+        return await self.get_job(job_id)
+
+    async def update_job(self, job_id: str, unless_status: Optional[str] = None, **fields) -> bool:
+        """
+        Set `fields` on a job. With `unless_status`, a job currently in that
+        status is left alone (returns False), so e.g. a finished import can't
+        overwrite a cancellation that landed first.
+        """
+        unknown = set(fields) - set(self.JOB_UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update import job columns: {sorted(unknown)}")
+        if "errors" in fields:
+            fields["errors"] = json.dumps(fields["errors"])
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        condition, params = "id = ?", [*fields.values(), job_id]
+        if unless_status is not None:
+            condition += " AND status != ?"
+            params.append(unless_status)
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                f"UPDATE import_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE {condition}",
+                params
+            )
+            return cursor.rowcount > 0
+
+    async def get_job(self, job_id: str) -> Optional[ImportJob]:
+        async with self.pool.reader() as db:
+            cursor = await db.execute(
+                """
+                SELECT id, kind, status, filename, rows_read, inserted, failed,
+                       errors, message, created_at, updated_at
+                FROM import_jobs WHERE id = ?
+                """,
+                (job_id,)
+            )
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        return ImportJob(
+            id=row[0],
+            kind=row[1],
+            status=row[2],
+            filename=row[3],
+            rows_read=row[4],
+            inserted=row[5],
+            failed=row[6],
+            errors=json.loads(row[7]) if row[7] else [],
+            message=row[8],
+            created_at=row[9],
+            updated_at=row[10]
+        )
+
+    async def fail_unfinished_jobs(self, message: str) -> int:
+        """Mark jobs left queued/running by a previous process as failed."""
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                """
+                UPDATE import_jobs SET status = 'failed', message = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE status IN ('queued', 'running')
+                """,
+                (message,)
+            )
+            return cursor.rowcount
+
+    # Webhook outbox methods
+    async def enqueue_webhook(self, url: str, event: str, payload: dict) -> int:
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                "INSERT INTO webhook_outbox (url, event, payload, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (url, event, json.dumps(payload), time.time())
+            )
+            return cursor.lastrowid
+
+    async def claim_due_webhooks(self, limit: int, lease_seconds: float) -> List[WebhookMessage]:
+        """
+        Lease up to `limit` due pending messages by pushing their
+        next_attempt_at `lease_seconds` ahead, so another poll (or process)
+        won't pick them up while they are being sent. If the sender dies,
+        the lease runs out and they are delivered again (at-least-once).
+        """
+        now = time.time()
+        async with self.pool.writer() as db:
+            cursor = await db.execute(
+                """
+                UPDATE webhook_outbox SET next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM webhook_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at, id
+                    LIMIT ?
+                )
+                RETURNING id, url, event, payload, attempts
+                """,
+                (now + lease_seconds, now, limit)
+            )
+            rows = await cursor.fetchall()
+        return sorted(
+            (
+                WebhookMessage(id=row[0], url=row[1], event=row[2], payload=json.loads(row[3]), attempts=row[4])
+                for row in rows
+            ),
+            key=lambda m: m.id,
+        )
+
+    async def mark_webhooks_delivered(self, ids: List[int]) -> None:
+        placeholders = ", ".join("?" for _ in ids)
+        async with self.pool.writer() as db:
+            await db.execute(
+                f"""
+                UPDATE webhook_outbox
+                SET status = 'delivered', attempts = attempts + 1, last_error = NULL,
+                    delivered_at = CURRENT_TIMESTAMP
+                WHERE id IN ({placeholders})
+                """,
+                ids
+            )
+
+    async def mark_webhooks_failed(
+        self,
+        ids: List[int],
+        error: str,
+        next_attempt_at: Optional[float],
+    ) -> None:
+        """Record a failed attempt; retry at next_attempt_at, or give up ('dead') when None."""
+        placeholders = ", ".join("?" for _ in ids)
+        async with self.pool.writer() as db:
+            await db.execute(
+                f"""
+                UPDATE webhook_outbox
+                SET attempts = attempts + 1, last_error = ?,
+                    status = CASE WHEN ? IS NULL THEN 'dead' ELSE 'pending' END,
+                    next_attempt_at = COALESCE(?, next_attempt_at)
+                WHERE id IN ({placeholders})
+                """,
+                (error, next_attempt_at, next_attempt_at, *ids)
+            )
+
+    async def count_webhooks_by_status(self) -> dict:
+        async with self.pool.reader() as db:
+            cursor = await db.execute("SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status")
+            return {status: count for status, count in await cursor.fetchall()}
+
     # Mechanic methods
     async def create_mechanic(self, mechanic: Mechanic) -> Mechanic:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             if mechanic.id is None:
                 mechanic.id = str(uuid4())
             await db.execute("""
@@ -372,11 +663,10 @@ class Repo:
                 mechanic.contact_number,
                 mechanic.experience_years
             ))
-            await db.commit()
             return mechanic
 
     async def get_mechanic(self, mechanic_id: str) -> Optional[Mechanic]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute(
                 "SELECT id, name, specialization, contact_number, experience_years FROM mechanics WHERE id = ?",
                 (mechanic_id,)
@@ -393,7 +683,7 @@ class Repo:
             return None
 
     async def list_mechanics(self) -> List[Mechanic]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute(
                 "SELECT id, name, specialization, contact_number, experience_years FROM mechanics"
             )
@@ -411,7 +701,7 @@ class Repo:
 
     # CHALLENGE 5: Add these methods for multi-modal support
     async def update_mechanic(self, mechanic: Mechanic) -> Mechanic:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute("""
                 UPDATE mechanics 
                 SET name = ?, specialization = ?, contact_number = ?, experience_years = ?
@@ -423,21 +713,19 @@ class Repo:
                 mechanic.experience_years,
                 mechanic.id
             ))
-            await db.commit()
             return mechanic if cursor.rowcount > 0 else None
 
     async def delete_mechanic(self, mechanic_id: str) -> bool:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.writer() as db:
             cursor = await db.execute(
                 "DELETE FROM mechanics WHERE id = ?",
                 (mechanic_id,)
             )
-            await db.commit()
             return cursor.rowcount > 0
 
     async def get_mechanic_with_most_services(self):
         """Get mechanic who has completed the most services"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute("""
                 SELECT m.id, m.name, COUNT(vsl.id) as service_count
                 FROM mechanics m
@@ -458,7 +746,7 @@ class Repo:
 
     async def get_mechanic_service_costs(self):
         """Get total cost of services performed by each mechanic"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.reader() as db:
             cursor = await db.execute("""
                 SELECT m.id, m.name, COALESCE(SUM(vsl.cost), 0) as total_cost
                 FROM mechanics m
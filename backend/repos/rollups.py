@@ -0,0 +1,286 @@
+"""
+Materialized analytics rollups for vehicle_service_logs.
+
+One row per (dimension, key) holding the service count, total cost and
+latest service date, e.g. ("mechanic_name", "Ramesh", 42, 130000.0, ...).
+SQLite triggers keep the table in sync inside the same transaction as every
+insert/update/delete on the logs table, so the analytics tools read a handful
+of rows instead of aggregating the whole table.
+
+Usage (from backend/):
+    python -m repos.rollups check
+    python -m repos.rollups rebuild
+    python -m repos.rollups bench --rows 200000   # trigger cost on a scratch table
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+import aiosqlite
+
+from constants import DB_NAME, TABLE_NAME
+
+ROLLUP_TABLE = "service_log_rollups"
+ROLLUP_DIMENSIONS = ("service_type", "mechanic_name", "owner_name", "vehicle_model")
+
+# Accumulated float error tolerated by the consistency check
+COST_TOLERANCE = 0.01
+
+# `bench` fails if a single-row delete/update takes longer than this on average
+BENCH_MAX_ROW_MS = 5.0
+
+
+def _add_row_sql(column: str, row: str) -> str:
+    return f"""
+        INSERT INTO {ROLLUP_TABLE} (dimension, key, count, total_cost, last_service_date)
+        VALUES ('{column}', COALESCE({row}.{column}, ''), 1, COALESCE({row}.cost, 0), {row}.service_date)
+        ON CONFLICT(dimension, key) DO UPDATE SET
+            count = count + 1,
+            total_cost = total_cost + excluded.total_cost,
+            last_service_date = NULLIF(MAX(COALESCE(last_service_date, ''), COALESCE(excluded.last_service_date, '')), '');
+    """
+
+
+def _key_sql(column: str) -> str:
+    """Rollup key of a logs row: missing values are grouped under ''."""
+    return f"COALESCE({column}, '')"
+
+
+def last_service_date_sql(column: str, key: str) -> str:
+    """
+    Latest service date for one rollup key. Served by the
+    (COALESCE(column, ''), service_date) index as a single seek.
+    """
+    return f"SELECT MAX(service_date) FROM {TABLE_NAME} WHERE {_key_sql(column)} = {key}"
+
+
+def _remove_row_sql(column: str, row: str) -> str:
+    key = _key_sql(f"{row}.{column}")
+    return f"""
+        UPDATE {ROLLUP_TABLE}
+        SET
+            count = count - 1,
+            total_cost = total_cost - COALESCE({row}.cost, 0),
+            last_service_date = CASE
+                WHEN last_service_date = {row}.service_date THEN ({last_service_date_sql(column, key)})
+                ELSE last_service_date
+            END
+        WHERE dimension = '{column}' AND key = {key};
+        DELETE FROM {ROLLUP_TABLE} WHERE dimension = '{column}' AND key = {key} AND count <= 0;
+    """
+
+
+def _cost_delta_sql(column: str) -> str:
+    return f"""
+        UPDATE {ROLLUP_TABLE}
+        SET total_cost = total_cost - COALESCE(OLD.cost, 0) + COALESCE(NEW.cost, 0)
+        WHERE dimension = '{column}' AND key = COALESCE(NEW.{column}, '');
+    """
+
+
+ROLLUP_TRIGGERS = ("insert", "delete", "update", "update_cost")
+
+
+async def create_rollup_schema(db: aiosqlite.Connection) -> None:
+    """Create the rollup table, the key indexes and the triggers that maintain it."""
+    await db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total_cost REAL NOT NULL,
+            last_service_date TEXT,
+            PRIMARY KEY (dimension, key)
+        )
+    """)
+
+    for column in ROLLUP_DIMENSIONS:
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_{column}_rollup_key "
+            f"ON {TABLE_NAME} ({_key_sql(column)}, service_date)"
+        )
+
+    add_new = "".join(_add_row_sql(c, "NEW") for c in ROLLUP_DIMENSIONS)
+    remove_old = "".join(_remove_row_sql(c, "OLD") for c in ROLLUP_DIMENSIONS)
+    cost_delta = "".join(_cost_delta_sql(c) for c in ROLLUP_DIMENSIONS)
+    watched = ", ".join(ROLLUP_DIMENSIONS + ("cost", "service_date"))
+    # Same keys and service date: only total_cost moves, no last_service_date recompute
+    same_keys = " AND ".join(f"OLD.{c} IS NEW.{c}" for c in ROLLUP_DIMENSIONS + ("service_date",))
+
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{ROLLUP_TABLE}_insert
+        AFTER INSERT ON {TABLE_NAME}
+        BEGIN {add_new} END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{ROLLUP_TABLE}_delete
+        AFTER DELETE ON {TABLE_NAME}
+        BEGIN {remove_old} END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{ROLLUP_TABLE}_update
+        AFTER UPDATE OF {watched} ON {TABLE_NAME}
+        WHEN NOT ({same_keys})
+        BEGIN {remove_old} {add_new} END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{ROLLUP_TABLE}_update_cost
+        AFTER UPDATE OF {watched} ON {TABLE_NAME}
+        WHEN {same_keys} AND OLD.cost IS NOT NEW.cost
+        BEGIN {cost_delta} END
+    """)
+
+
+async def recreate_rollup_triggers(db: aiosqlite.Connection) -> None:
+    """Replace the triggers (and add missing indexes) after their definition changes."""
+    for name in ROLLUP_TRIGGERS:
+        await db.execute(f"DROP TRIGGER IF EXISTS trg_{ROLLUP_TABLE}_{name}")
+    await create_rollup_schema(db)
+
+
+def _aggregate_sql(column: str) -> str:
+    return f"""
+        SELECT '{column}', COALESCE({column}, ''), COUNT(*), COALESCE(SUM(cost), 0), MAX(service_date)
+        FROM {TABLE_NAME}
+        GROUP BY COALESCE({column}, '')
+    """
+
+
+async def rebuild_rollups(db: aiosqlite.Connection) -> int:
+    """Recompute every rollup row from the logs table. Returns rows written."""
+    await db.execute(f"DELETE FROM {ROLLUP_TABLE}")
+    written = 0
+    for column in ROLLUP_DIMENSIONS:
+        cursor = await db.execute(
+            f"INSERT INTO {ROLLUP_TABLE} (dimension, key, count, total_cost, last_service_date) "
+            + _aggregate_sql(column)
+        )
+        written += cursor.rowcount
+    return written
+
+
+async def check_rollups(db: aiosqlite.Connection) -> List[dict]:
+    """
+    Compare the rollup table with a fresh aggregation of the logs table.
+    Returns one entry per mismatching (dimension, key); empty means consistent.
+    """
+    expected = {}
+    for column in ROLLUP_DIMENSIONS:
+        cursor = await db.execute(_aggregate_sql(column))
+        for dimension, key, count, total_cost, last_date in await cursor.fetchall():
+            expected[(dimension, key)] = (count, total_cost, last_date)
+
+    cursor = await db.execute(
+        f"SELECT dimension, key, count, total_cost, last_service_date FROM {ROLLUP_TABLE}"
+    )
+    actual = {(row[0], row[1]): (row[2], row[3], row[4]) for row in await cursor.fetchall()}
+
+    mismatches = []
+    for ident in sorted(expected.keys() | actual.keys()):
+        want = expected.get(ident)
+        got = actual.get(ident)
+        if (
+            want is None
+            or got is None
+            or want[0] != got[0]
+            or abs(want[1] - got[1]) > COST_TOLERANCE
+            or want[2] != got[2]
+        ):
+            mismatches.append({
+                "dimension": ident[0],
+                "key": ident[1],
+                "expected": want,
+                "actual": got,
+            })
+    return mismatches
+
+
+async def _bench(repo, rows: int, samples: int = 200) -> int:
+    """
+    Fill `repo` with `rows` synthetic logs and time the trigger-maintained
+    writes: single-row deletes, cost-only updates, service-date updates and a
+    bulk update_service_cost_by_model. Checks the rollups afterwards.
+    """
+    from repos.synthetic import START, fill, synthetic_log
+
+    models = rows // 1000 or 1
+
+    def log(i: int):
+        return synthetic_log(i, rows)
+
+    print(f"Inserted {rows} rows in {await fill(repo, rows):.1f}s")
+
+    async def timed(label: str, calls) -> float:
+        started = time.perf_counter()
+        for call in calls:
+            await call
+        per_row_ms = (time.perf_counter() - started) / samples * 1000
+        print(f"{label:<28} {per_row_ms:8.3f} ms/row")
+        return per_row_ms
+
+    ids = range(rows - samples, rows)  # the latest rows, so the date recompute always runs
+    worst = max(
+        await timed("update (cost only)", (repo.update(log(i).model_copy(update={"cost": 1.0})) for i in ids)),
+        await timed(
+            "update (service_date)",
+            (repo.update(log(i).model_copy(update={"service_date": START})) for i in ids),
+        ),
+        await timed("delete", (repo.delete(f"bench-{i}") for i in ids)),
+    )
+
+    started = time.perf_counter()
+    await repo.update_service_cost_by_model("Bench Model 0001", 999.0)
+    print(f"{'update_service_cost_by_model':<28} {time.perf_counter() - started:8.3f} s ({rows // models} rows)")
+
+    mismatches = await repo.check_rollups()
+    print(f"{len(mismatches)} rollup mismatch(es) after the benchmark")
+    if worst > BENCH_MAX_ROW_MS:
+        print(f"FAIL: {worst:.3f} ms/row exceeds {BENCH_MAX_ROW_MS} ms")
+    return 1 if mismatches or worst > BENCH_MAX_ROW_MS else 0
+
+
+async def _run(command: str, db_path: str, rows: int) -> int:
+    # Imported here so the module stays importable from migrations without a cycle
+    from repos.repo import Repo
+    from repos.pool import close_all_pools
+
+    if command == "bench":
+        with tempfile.TemporaryDirectory(prefix="rollup_bench_") as workdir:
+            repo = Repo(os.path.join(workdir, "bench.db"))
+            try:
+                await repo.init_db()
+                return await _bench(repo, rows)
+            finally:
+                await close_all_pools()
+
+    repo = Repo(db_path)
+    try:
+        await repo.init_db()
+        if command == "rebuild":
+            written = await repo.rebuild_rollups()
+            print(f"Rebuilt {written} rollup row(s) in {db_path}")
+            return 0
+
+        mismatches = await repo.check_rollups()
+        for m in mismatches:
+            print(f"MISMATCH {m['dimension']}={m['key']!r}: expected {m['expected']}, found {m['actual']}")
+        print(f"{len(mismatches)} mismatch(es) found in {db_path}")
+        return 1 if mismatches else 0
+    finally:
+        await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain service log analytics rollups")
+    parser.add_argument("command", choices=["check", "rebuild", "bench"])
+    parser.add_argument("--db", default=DB_NAME, help="SQLite database path")
+    parser.add_argument("--rows", type=int, default=100_000, help="bench: rows in the scratch table")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args.command, args.db, args.rows)))
+
+
+if __name__ == "__main__":
+    main()
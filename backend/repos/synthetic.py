@@ -0,0 +1,43 @@
+"""
+Synthetic service logs for the benchmark and plan-check entry points
+(python -m repos.rollups bench, python -m repos.query_plans --rows, ...).
+
+Row i is deterministic, so a benchmark can rebuild any row it inserted
+(e.g. to update it) from its index alone.
+"""
+import time
+from datetime import datetime, timedelta
+
+from models.data_models import Mechanic, VehicleServiceLog
+
+START = datetime(2020, 1, 1)
+MECHANICS = 40
+
+
+def synthetic_log(i: int, rows: int) -> VehicleServiceLog:
+    """Row `i` of a `rows`-row table: ~1000 rows per vehicle model, 4 per vehicle."""
+    models = rows // 1000 or 1
+    return VehicleServiceLog(
+        id=f"bench-{i}",
+        vehicle_model=f"Bench Model {i % models:04d}",
+        owner_name=f"Owner {i // 2}",
+        owner_phone_number=f"+1555{i // 2 % 10_000_000:07d}",
+        vehicle_id=f"BENCH-{i // 4}",
+        service_date=START + timedelta(hours=i),
+        service_type=f"Service {i % 12}",
+        cost=float(1000 + i % 500),
+        next_service_date=START + timedelta(hours=i, days=180),
+        mechanic_name=f"Mechanic {i % MECHANICS}" if i % 10 else None,
+    )
+
+
+async def fill(repo, rows: int) -> float:
+    """Insert `rows` synthetic logs plus the mechanics they name. Returns seconds taken."""
+    started = time.perf_counter()
+    for n in range(MECHANICS):
+        await repo.create_mechanic(Mechanic(
+            id=f"bench-mechanic-{n}", name=f"Mechanic {n}", specialization="General",
+            contact_number=f"+1666{n:07d}", experience_years=n % 30,
+        ))
+    await repo.insert_many(synthetic_log(i, rows) for i in range(rows))
+    return time.perf_counter() - started
@@ -1,19 +1,26 @@
 # backend/routers/auth.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth_db import get_db
+from auth_cache import auth_cache
+from auth_db import SessionLocal, get_db
 from auth_models import User
 from auth_schemas import Token, UserCreate, UserRead
 from auth_security import (
+    PasswordHasherBusyError,
     create_access_token,
     decode_access_token,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_update_password_async,
 )
-
+from constants import ADMIN_API_TOKEN
 from utils.webhooks import send_make_webhook
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -21,71 +28,152 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+async def _get_user_by_email(db: AsyncSession, email: str):
+    user = await db.scalar(select(User).where(User.email == email))
+    # End the read transaction so the pooled connection isn't held while
+    # bcrypt runs (expire_on_commit=False keeps `user` usable)
+    await db.commit()
+    return user
+
+
+async def _load_user(user_id: int):
+    async with SessionLocal() as db:
+        user = await db.get(User, user_id)
+        return UserRead.model_validate(user, from_attributes=True) if user else None
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserRead:
+    """
+    Authentication dependency for any router:
+
+        user: UserRead = Depends(get_current_user)
+
+    Decoded tokens and user records are served from auth_cache, so repeat
+    requests with the same token skip both JWT decoding and the DB.
+    """
+    user_id = auth_cache.get_token(token)
+    if user_id is None:
+        payload = decode_access_token(token)
+        if not payload or "sub" not in payload:
+            raise _unauthorized("Invalid token")
+        user_id = int(payload["sub"])
+        auth_cache.put_token(token, user_id, payload.get("exp"))
+
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        user = await _load_user(user_id)
+        if user is None:
+            raise _unauthorized("User not found")
+        auth_cache.put_user(user)
+    return user
+
+
+async def get_admin_user(
+    user: UserRead = Depends(get_current_user),
+    x_admin_token: Optional[str] = Header(default=None),
+) -> UserRead:
+    """
+    Admin dependency: a logged-in user who also sends the ADMIN_API_TOKEN
+    shared secret in X-Admin-Token. Accounts are open to self-registration,
+    so being logged in alone proves nothing. With no token configured,
+    admin routes are closed to everyone.
+    """
+    if not ADMIN_API_TOKEN or x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), ADMIN_API_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return user
+
+
+def _email_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered",
+    )
+
+
+def _hasher_busy(e: PasswordHasherBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserRead)
-def register_user(
+async def register_user(
     user_in: UserCreate,
-    background: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    existing = db.query(User).filter(User.email == user_in.email).first()
+    # DB calls are async, bcrypt runs in its own process pool, so neither
+    # blocks the event loop
+    existing = await _get_user_by_email(db, user_in.email)
     if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
-        )
+        raise _email_taken()
+
+    try:
+        hashed_password = await hash_password_async(user_in.password)
+    except PasswordHasherBusyError as e:
+        raise _hasher_busy(e)
 
     user = User(
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=hashed_password,
         full_name=user_in.full_name,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # Enqueue Make webhook (if configured) to send welcome email automation
     try:
-        background.add_task(send_make_webhook, user.email, user.full_name, user.id)
+        await db.commit()
+    except IntegrityError:
+        # Registered concurrently between the check above and this insert
+        await db.rollback()
+        raise _email_taken()
+
+    # Queue Make webhook (if configured) to send welcome email automation;
+    # delivery and retries happen in the webhook dispatcher
+    try:
+        await send_make_webhook(user.email, user.full_name, user.id)
     except Exception as e:
-        print(f"Failed to enqueue Make webhook background task: {e}")
+        print(f"Failed to enqueue Make webhook: {e}")
 
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(user_in: UserCreate, db: Session = Depends(get_db)):
+async def login(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Frontend sends JSON: { "email": "...", "password": "..." }
     """
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if not user or not verify_password(user_in.password, user.hashed_password):
+    user = await _get_user_by_email(db, user_in.email)
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await verify_and_update_password_async(user_in.password, user.hashed_password)
+        except PasswordHasherBusyError as e:
+            raise _hasher_busy(e)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
 
+    # Stored hash used an old bcrypt cost; upgrade it transparently
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": str(user.id)})
     return Token(access_token=token)
 
 
 @router.get("/me", response_model=UserRead)
-def get_me(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
-
-    user_id = int(payload["sub"])
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-
+async def get_me(user: UserRead = Depends(get_current_user)):
     return user
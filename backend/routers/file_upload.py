@@ -1,19 +1,42 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from fastapi.responses import JSONResponse
-import pandas as pd
 import io
 import json
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
 import logging
+from services.service import Service
+from services.import_service import CSV_CONTENT_TYPES, EXCEL_CONTENT_TYPES, import_service_logs
+from services.job_service import QueueFullError, import_jobs
+from repos.repo import Repo
+from constants import DB_NAME, IMPORT_CHUNK_SIZE
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+repo = Repo(DB_NAME)
+service = Service(repo)
 
 @router.post("/process-file")
-async def process_file(file: UploadFile = File(...)):
+async def process_file(
+    file: UploadFile = File(...),
+    mode: str = Query("preview", pattern="^(preview|import|background)$"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=100, le=100_000),
+):
     """
     Process uploaded files (Excel, CSV, PDF) and convert to text format for the agent
+
+    mode=import instead streams the rows into the service log table in
+    chunks of `chunk_size` and returns inserted/failed counts with per-row errors.
+    mode=background queues the same import and returns a job to poll at
+    GET /jobs/{id}.
     """
+    if mode == "import":
+        return await import_file(file, chunk_size)
+    if mode == "background":
+        return await queue_import(file, chunk_size)
+
     try:
         # Read file content
         contents = await file.read()
@@ -35,10 +58,46 @@ async def process_file(file: UploadFile = File(...)):
         logger.error(f"Error processing file: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+async def import_file(file: UploadFile, chunk_size: int) -> Dict[str, Any]:
+    """Import every row of a CSV/Excel upload into vehicle_service_logs"""
+    if file.content_type not in CSV_CONTENT_TYPES | EXCEL_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload Excel or CSV files.")
+
+    try:
+        # UploadFile is already spooled to a temp file; read it incrementally
+        result = await import_service_logs(file.file, file.content_type, service, chunk_size)
+    except Exception as e:
+        logger.error(f"Error importing file: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error importing file: {str(e)}")
+
+    return {
+        "success": True,
+        "filename": file.filename,
+        **result,
+        "message": (
+            f"Imported {result['inserted']} of {result['rows_read']} records from {file.filename}"
+            f" ({result['failed']} failed)."
+        ),
+    }
+
+async def queue_import(file: UploadFile, chunk_size: int) -> JSONResponse:
+    """Queue a CSV/Excel upload for background import and return the job"""
+    if file.content_type not in CSV_CONTENT_TYPES | EXCEL_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload Excel or CSV files.")
+
+    try:
+        job = await import_jobs.submit(file.file, file.filename, file.content_type, chunk_size)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return JSONResponse(status_code=202, content=job.model_dump())
+
 async def process_excel_file(contents: bytes, filename: str) -> Dict[str, Any]:
     """Process Excel file and convert to structured text"""
     try:
         # Read Excel file
+        import pandas as pd  # deferred: keeps pandas out of app startup
+
         df = pd.read_excel(io.BytesIO(contents))
         
         # Convert to structured text
@@ -59,6 +118,8 @@ async def process_csv_file(contents: bytes, filename: str) -> Dict[str, Any]:
     """Process CSV file and convert to structured text"""
     try:
         # Read CSV file
+        import pandas as pd  # deferred: keeps pandas out of app startup
+
         df = pd.read_csv(io.BytesIO(contents))
         
         # Convert to structured text
@@ -75,7 +136,7 @@ async def process_csv_file(contents: bytes, filename: str) -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading CSV file: {str(e)}")
 
-def convert_dataframe_to_text(df: pd.DataFrame, filename: str) -> str:
+def convert_dataframe_to_text(df: "pd.DataFrame", filename: str) -> str:
     """Convert DataFrame to structured text format for the agent"""
     
     text_parts = []
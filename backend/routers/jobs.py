@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from models.data_models import ImportJob
+from services.job_service import import_jobs
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=ImportJob)
+async def get_job(job_id: str):
+    """Get status, row counts and errors for a background import job"""
+    job = await import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=ImportJob)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running import job"""
+    job = await import_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,19 +1,46 @@
-from fastapi import APIRouter, status
-from typing import List, Optional
-from pydantic import BaseModel
-from services.ml_service import ml_service
+import base64
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
+from services.ml_service import InferenceSaturatedError, ml_service
+from services.model_registry import VERSION_PATTERN
 from models.data_models import VehicleServiceLog
+from auth_schemas import UserRead
+from routers.auth import get_admin_user
 from services.service import Service
 from repos.repo import Repo
-from constants import DB_NAME
+from constants import BULK_INSERT_BATCH_SIZE, DB_NAME, ML_MAX_BATCH_REQUEST_ROWS
 
 router = APIRouter()
 repo = Repo(DB_NAME)
 service = Service(repo)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        service_date, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(service_date), str(log_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
 
 @router.get("/", response_model=List[VehicleServiceLog])
-async def get_vehicle_service_logs(vehicle_id: Optional[str] = None):
+async def get_vehicle_service_logs(
+    response: Response,
+    vehicle_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
     """
     Retrieve vehicle service logs, optionally filtered by vehicle ID.
 
@@ -29,8 +56,33 @@ async def get_vehicle_service_logs(vehicle_id: Optional[str] = None):
     - cost
     - next_service_date
     - mechanic_id
+
+    Pagination (ordered by service_date, id):
+    - limit: page size; the cursor for the next page is returned in the
+      X-Next-Cursor header (absent on the last page)
+    - after: cursor from a previous page
+
+    format=ndjson streams every matching log (from `after`, if given) as
+    newline-delimited JSON, reading the table in batches.
     """
-    return await service.get_vehicle_service_logs(vehicle_id)
+    after_key = _decode_cursor(after) if after else None
+
+    if format == "ndjson":
+        async def ndjson_lines():
+            async for log in service.stream_vehicle_service_logs(vehicle_id, after_key):
+                yield log.model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    if limit is None and after_key is None:
+        return await service.get_vehicle_service_logs(vehicle_id)
+
+    logs, next_key = await service.get_vehicle_service_logs_page(
+        vehicle_id, after_key, limit or DEFAULT_PAGE_SIZE
+    )
+    if next_key:
+        response.headers["X-Next-Cursor"] = _encode_cursor(next_key)
+    return logs
 
 
 @router.post(
@@ -59,6 +111,78 @@ async def create_vehicle_service_log(log: VehicleServiceLog):
     return await service.create_vehicle_service_log(log)
 
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def create_vehicle_service_logs_bulk(
+    request: Request,
+    batch_size: int = Query(BULK_INSERT_BATCH_SIZE, ge=1, le=10000),
+):
+    """
+    Insert many vehicle service logs in one transaction.
+
+    Body is either a JSON array of logs, or NDJSON (one log per line) when
+    sent with Content-Type: application/x-ndjson.
+
+    Returns the number inserted and a per-row error list; `index` is the
+    row's position in the request (0-based array index / NDJSON line).
+    """
+    errors = []
+    valid_logs = []
+    positions = []
+
+    def accept(index: int, item) -> None:
+        try:
+            valid_logs.append(VehicleServiceLog.model_validate(item))
+            positions.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors(include_url=False)})
+
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        index = 0
+        async for line in _iter_lines(request):
+            if line.strip():
+                try:
+                    accept(index, json.loads(line))
+                except json.JSONDecodeError as e:
+                    errors.append({"index": index, "error": f"Invalid JSON: {e}"})
+            index += 1
+    else:
+        try:
+            items = await request.json()
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of logs")
+        for index, item in enumerate(items):
+            accept(index, item)
+
+    result = await service.create_vehicle_service_logs_bulk(valid_logs, batch_size)
+
+    # Map repo-level errors back to request positions
+    for err in result["errors"]:
+        err["index"] = positions[err["index"]]
+    errors.extend(result["errors"])
+    errors.sort(key=lambda e: e["index"])
+
+    return {
+        "inserted": result["inserted"],
+        "failed": len(errors),
+        "errors": errors,
+    }
+
+
+async def _iter_lines(request: Request):
+    """Yield decoded lines from the request body without buffering all of it."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
 @router.put(
     "/{log_id}",
     status_code=status.HTTP_200_OK,
@@ -98,6 +222,16 @@ class CostEstimateRequest(BaseModel):
     mechanic_name: Optional[str] = None
 
 
+def _raise_if_model_loading() -> None:
+    """The model warms in the background at startup; ask clients to retry."""
+    if ml_service.status == "loading":
+        raise HTTPException(
+            status_code=503,
+            detail="ML model is still loading, try again shortly",
+            headers={"Retry-After": "2"},
+        )
+
+
 @router.post("/estimate-cost")
 async def estimate_cost(req: CostEstimateRequest):
     """
@@ -109,21 +243,112 @@ async def estimate_cost(req: CostEstimateRequest):
     - mileage
     - mechanic_name (optional)
     """
+    _raise_if_model_loading()
     if not ml_service.is_ready():
         return {
             "success": False,
             "message": "ML model not available. Train it first."
         }
 
-    result = ml_service.estimate_cost(
-        vehicle_model=req.vehicle_model,
-        service_type=req.service_type,
-        mileage=req.mileage,
-        mechanic_name=req.mechanic_name,
-    )
+    try:
+        result = await ml_service.estimate_cost_coalesced(
+            vehicle_model=req.vehicle_model,
+            service_type=req.service_type,
+            mileage=req.mileage,
+            mechanic_name=req.mechanic_name,
+        )
+    except InferenceSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     return {
         "success": True,
         "message": "Estimated service cost",
         "data": result,
     }
+
+
+@router.get("/estimate-cost/stats")
+async def estimate_cost_stats():
+    """Prediction counters, latency histogram and cache stats for the ML cost model."""
+    return {
+        "model_ready": ml_service.is_ready(),
+        "model_status": ml_service.status,
+        **ml_service.monitor.snapshot(),
+        "cache": ml_service.cache.stats(),
+    }
+
+
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = Field(default=None, pattern=rf"^{VERSION_PATTERN.pattern}$")
+
+
+@router.get("/estimate-cost/model")
+async def estimate_cost_model():
+    """Served cost model version and metadata, plus every registered version."""
+    return {
+        "model_ready": ml_service.is_ready(),
+        "active_version": ml_service.model_version,
+        "metadata": ml_service.model_metadata,
+        "versions": ml_service.registry.list_versions(),
+    }
+
+
+@router.post("/estimate-cost/model/reload")
+async def reload_estimate_cost_model(
+    req: Optional[ModelReloadRequest] = None,
+    user: UserRead = Depends(get_admin_user),
+):
+    """
+    Hot-swap the cost model without a restart. With a version, activate it
+    first; otherwise reload whatever the registry currently marks ACTIVE.
+    Admin only (see get_admin_user).
+    """
+    version = req.version if req else None
+    if version is not None and not ml_service.registry.has_version(version):
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+
+    try:
+        metadata = await ml_service.reload(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "success": True,
+        "message": f"Serving cost model version {ml_service.model_version}",
+        "data": metadata,
+    }
+
+
+@router.post("/estimate-cost/batch")
+async def estimate_cost_batch(reqs: List[CostEstimateRequest]):
+    """
+    ML-based cost estimates for many rows in one vectorized predict call.
+
+    Body is a JSON array of objects with the same fields as /estimate-cost.
+    Results are returned in the same order.
+    """
+    if len(reqs) > ML_MAX_BATCH_REQUEST_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {ML_MAX_BATCH_REQUEST_ROWS} rows per batch request",
+        )
+
+    _raise_if_model_loading()
+    if not ml_service.is_ready():
+        return {
+            "success": False,
+            "message": "ML model not available. Train it first."
+        }
+
+    try:
+        results = await ml_service.estimate_costs_batch_async([req.model_dump() for req in reqs])
+    except InferenceSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "success": True,
+        "message": f"Estimated service cost for {len(results)} row(s)",
+        "data": results,
+    }
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from services.webhook_service import webhook_dispatcher
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def webhook_metrics():
+    """Delivery counters since startup plus outbox counts by status"""
+    return await webhook_dispatcher.stats()
@@ -0,0 +1,373 @@
+"""
+Benchmarks for the service layer. Anything that needs the database uses a
+scratch copy filled with synthetic logs (repos/synthetic.py).
+
+    inference   service-log read latency during a burst of batch cost
+                estimates: predict inline on the event loop (before) vs. on
+                the inference pool (after), then the same burst replayed with
+                the prediction cache on
+    login       login throughput (bcrypt verify) and how long a sync route
+                waits for a threadpool slot meanwhile: verify on the shared
+                threadpool (before) vs. on the password hashing pool (after)
+    sms         ReminderSender throughput for --messages reminders over
+                FakeSmsTransport(latency=...): one at a time (before, timed
+                on a sample) vs. concurrent, rate-capped and with injected
+                failures, plus event-loop lag during each run
+    startup     cold start of the real app (uvicorn main:app, run from a
+                scratch copy of the database): time until /health answers
+                and until /health/ready reports the cost model warm
+
+Usage (from backend/):
+    python -m services.bench inference --estimates 80 --batch-rows 2000
+    python -m services.bench login --logins 100 --clients 50
+    python -m services.bench sms --messages 10000 --latency 0.05
+    python -m services.bench startup --runs 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from constants import DB_NAME
+from repos.pool import close_all_pools
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+VEHICLE_MODELS = ("Hyundai i20", "Maruti Baleno", "Honda City", "Hyundai Creta", "Maruti Swift", "Kia Seltos")
+SERVICE_TYPES = ("General Service", "Clutch Overhaul", "Brake Service", "Engine Repair", "AC Repair")
+MECHANICS = ("Anil", "Sameer", "Manoj", "Deepak", None)
+
+
+def _latency_summary(latencies: List[float]) -> str:
+    if not latencies:
+        return "no samples"
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    return (
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   "
+        f"max {latencies[-1] * 1000:8.2f} ms   ({len(latencies)} reads)"
+    )
+
+
+# ---------- inference ----------
+
+def _estimate_items(rng: random.Random, rows: int, max_mileage: int) -> List[Dict]:
+    return [
+        {
+            "vehicle_model": rng.choice(VEHICLE_MODELS),
+            "service_type": rng.choice(SERVICE_TYPES),
+            "mileage": rng.randrange(1_000, max_mileage),
+            "mechanic_name": rng.choice(MECHANICS),
+        }
+        for _ in range(rows)
+    ]
+
+
+async def _bench_inference(db_path: str, estimates: int, batch_rows: int, max_mileage: int) -> int:
+    from repos.repo import Repo
+    from repos.synthetic import fill
+    from services.ml_service import InferenceSaturatedError, PredictionCache, ml_service
+
+    rows = 20_000
+    repo = Repo(db_path)
+    await repo.init_db()
+    await fill(repo, rows)
+    if not ml_service.load():
+        print("No cost model to load; train one first")
+        return 1
+
+    rng = random.Random(42)
+    bursts = [_estimate_items(rng, batch_rows, max_mileage) for _ in range(estimates)]
+
+    async def reads_during(burst: Callable[[], Awaitable]) -> List[float]:
+        """Back-to-back Repo.get calls for as long as `burst` runs."""
+        latencies: List[float] = []
+        done = asyncio.Event()
+
+        async def reader() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await repo.get(f"bench-{rng.randrange(rows)}")
+                latencies.append(time.perf_counter() - started)
+
+        task = asyncio.create_task(reader())
+        try:
+            await burst()
+        finally:
+            done.set()
+            await task
+        return latencies
+
+    async def idle() -> None:
+        await asyncio.sleep(1.0)
+
+    async def inline() -> None:
+        # What the endpoint did before: sklearn predict straight on the event loop
+        async def one(items):
+            await asyncio.sleep(0)
+            ml_service.estimate_costs_batch(items)
+        await asyncio.gather(*(one(items) for items in bursts))
+
+    outcome = {"done": 0, "rejected": 0}
+
+    async def pooled() -> None:
+        async def one(items):
+            try:
+                await ml_service.estimate_costs_batch_async(items)
+                outcome["done"] += 1
+            except InferenceSaturatedError:
+                outcome["rejected"] += 1
+        await asyncio.gather(*(one(items) for items in bursts))
+
+    print(f"{estimates} concurrent estimates of {batch_rows} rows each, "
+          f"{ml_service.executor.workers} inference workers, queue {ml_service.executor.max_pending}")
+    ml_service.cache = PredictionCache(max_size=0)  # every row reaches the model
+    for label, burst in (("no estimates", idle), ("inline predict", inline), ("inference pool", pooled)):
+        outcome.update(done=0, rejected=0)
+        started = time.perf_counter()
+        latencies = await reads_during(burst)
+        extra = f"   {outcome['done']} done, {outcome['rejected']} rejected (503)" if burst is pooled else ""
+        print(f"{label:<22} {time.perf_counter() - started:6.2f}s   {_latency_summary(latencies)}{extra}")
+
+    # Replay the burst with the cache on: the first pass fills it, the second is served from it
+    ml_service.cache = cache = PredictionCache()
+    keys = {ml_service._cache_key(item) for items in bursts for item in items}
+    print(f"{len(keys)} distinct cache keys, cache size {cache.max_size}")
+    for label in ("pool, cold cache", "pool, warm cache"):
+        outcome.update(done=0, rejected=0)
+        cache.hits = cache.misses = 0
+        started = time.perf_counter()
+        latencies = await reads_during(pooled)
+        print(f"{label:<22} {time.perf_counter() - started:6.2f}s   {_latency_summary(latencies)}   "
+              f"{outcome['done']} done, {outcome['rejected']} rejected (503), hit rate {cache.stats()['hit_rate']:.2%}")
+    ml_service.shutdown()
+    return 0
+
+
+# ---------- login ----------
+
+async def _bench_login(logins: int, clients: int) -> int:
+    from auth_security import (
+        PasswordHasherBusyError,
+        hash_password,
+        shutdown_password_pool,
+        verify_and_update_password,
+        verify_and_update_password_async,
+    )
+    from constants import BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_WORKERS
+
+    password = "correct horse battery staple"
+    hashed = hash_password(password)
+
+    async def on_threadpool(plain: str, stored: str):
+        # What /auth/login did before: bcrypt in the threadpool shared with sync routes
+        return await asyncio.to_thread(verify_and_update_password, plain, stored)
+
+    print(f"{logins} logins from {clients} clients, bcrypt cost {BCRYPT_ROUNDS}, "
+          f"{PASSWORD_HASH_WORKERS} hashing workers, queue {PASSWORD_HASH_QUEUE_SIZE}")
+    await verify_and_update_password_async(password, hashed)  # start the workers outside the timing
+    try:
+        for label, verify in (("shared threadpool", on_threadpool), ("hash pool", verify_and_update_password_async)):
+            counter = iter(range(logins))
+            outcome = {"ok": 0, "rejected": 0}
+            probes: List[float] = []
+            done = asyncio.Event()
+
+            async def client() -> None:
+                for _ in counter:
+                    try:
+                        valid, _new_hash = await verify(password, hashed)
+                        outcome["ok"] += valid
+                    except PasswordHasherBusyError:
+                        outcome["rejected"] += 1
+
+            async def sync_route() -> None:
+                # Another sync endpoint: a no-op that needs a threadpool slot
+                while not done.is_set():
+                    started = time.perf_counter()
+                    await asyncio.to_thread(lambda: None)
+                    probes.append(time.perf_counter() - started)
+                    await asyncio.sleep(0.01)
+
+            probe = asyncio.create_task(sync_route())
+            started = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(clients)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            await probe
+            print(f"{label:<18} {outcome['ok'] / elapsed:6.1f} logins/s   {outcome['rejected']} rejected (503)   "
+                  f"sync route: {_latency_summary(probes).replace('reads', 'calls')}")
+    finally:
+        shutdown_password_pool()
+    return 0
+
+
+# ---------- sms ----------
+
+async def _loop_lag_during(work: Awaitable, interval: float = 0.01) -> Tuple[object, float]:
+    """Await `work`; returns its result and the worst event-loop lag seen meanwhile."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        nonlocal worst
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst = max(worst, time.perf_counter() - started - interval)
+
+    task = asyncio.create_task(probe())
+    try:
+        return await work, worst
+    finally:
+        done.set()
+        await task
+
+
+async def _bench_sms(
+    messages: int, latency: float, sequential: int, concurrency: int, rate: float, failure_rate: float
+) -> int:
+    from services.sms_service import FakeSmsTransport, ReminderSender, SmsMessage
+
+    batch = [
+        SmsMessage(f"+1555{n:07d}", f"Reminder: vehicle BENCH-{n} is due for service.")
+        for n in range(messages)
+    ]
+    runs = (
+        (f"sequential (sample of {sequential})", batch[:sequential], dict(concurrency=1, rate_per_second=0), 0.0),
+        (f"concurrency {concurrency}", batch, dict(concurrency=concurrency, rate_per_second=0), 0.0),
+        (f"concurrency {concurrency}, {rate:g}/s cap", batch, dict(concurrency=concurrency, rate_per_second=rate), 0.0),
+        (f"concurrency {concurrency}, {failure_rate:.0%} failing", batch,
+         dict(concurrency=concurrency, rate_per_second=0), failure_rate),
+    )
+    print(f"{messages} messages, fake transport latency {latency * 1000:.0f} ms")
+    for label, sample, settings, failures in runs:
+        sender = ReminderSender(FakeSmsTransport(latency=latency, failure_rate=failures), **settings)
+        started = time.perf_counter()
+        results, lag = await _loop_lag_during(sender.send_all(sample))
+        elapsed = time.perf_counter() - started
+        sent = sum(1 for r in results if r.status == sender.transport.sent_status)
+        retries = sum(r.attempts - 1 for r in results)
+        estimate = f"   ({messages} would take ~{messages * elapsed / len(sample):.0f}s)" if len(sample) < messages else ""
+        print(f"{label:<34} {len(sample) / elapsed:7.0f} msg/s   {sent} sent, {len(sample) - sent} failed, "
+              f"{retries} retries in {elapsed:.1f}s   max loop lag {lag * 1000:.1f} ms{estimate}")
+    return 0
+
+
+# ---------- startup ----------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _status(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None  # not listening yet
+
+
+def _cold_start(workdir: str, timeout: float) -> Tuple[float, float]:
+    """Start the app once; returns seconds until /health answered and until /health/ready was 200."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_request = None
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            if first_request is None:
+                if _status(f"{base}/health") == 200:
+                    first_request = time.perf_counter() - started
+            elif _status(f"{base}/health/ready") == 200:
+                return first_request, time.perf_counter() - started
+            time.sleep(0.01)
+        raise TimeoutError(f"App not ready within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def _bench_startup(workdir: str, runs: int, timeout: float = 120.0) -> int:
+    # The app opens ./vehicle_service_logs.db; never let it touch the bundled one
+    shutil.copy(BACKEND_DIR / DB_NAME, os.path.join(workdir, DB_NAME))
+    results = []
+    for run in range(1, runs + 1):
+        first_request, ready = _cold_start(workdir, timeout)
+        results.append((first_request, ready))
+        print(f"run {run}: first request answered after {first_request:5.2f}s, model ready after {ready:5.2f}s")
+    print(
+        f"median: first request {statistics.median(r[0] for r in results):.2f}s, "
+        f"ready {statistics.median(r[1] for r in results):.2f}s "
+        "(with eager loading the first request could not be answered before the model was ready)"
+    )
+    return 0
+
+
+# ---------- CLI ----------
+
+async def _run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="service_bench_") as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        try:
+            if args.command == "login":
+                return await _bench_login(args.logins, args.clients)
+            if args.command == "sms":
+                return await _bench_sms(
+                    args.messages, args.latency, args.sequential, args.concurrency, args.rate, args.failure_rate
+                )
+            if args.command == "startup":
+                return await asyncio.to_thread(_bench_startup, workdir, args.runs)
+            if args.command == "inference":
+                return await _bench_inference(db_path, args.estimates, args.batch_rows, args.max_mileage)
+            raise ValueError(args.command)
+        finally:
+            await close_all_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the service layer")
+    parser.add_argument("command", choices=["inference", "login", "sms", "startup"])
+    parser.add_argument("--estimates", type=int, default=80, help="inference: concurrent batch estimates")
+    parser.add_argument("--batch-rows", type=int, default=2_000, help="inference: rows per batch estimate")
+    parser.add_argument("--max-mileage", type=int, default=60_000,
+                        help="inference: mileage range of the requests (sets how many distinct cache keys there are)")
+    parser.add_argument("--logins", type=int, default=100, help="login: logins per mode")
+    parser.add_argument("--clients", type=int, default=50, help="login: concurrent clients")
+    parser.add_argument("--messages", type=int, default=10_000, help="sms: reminders to send")
+    parser.add_argument("--latency", type=float, default=0.05, help="sms: fake provider seconds per message")
+    parser.add_argument("--sequential", type=int, default=200, help="sms: messages timed one at a time")
+    parser.add_argument("--concurrency", type=int, default=100, help="sms: messages in flight")
+    parser.add_argument("--rate", type=float, default=500, help="sms: provider calls per second in the capped run")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="sms: failing attempts in the last run")
+    parser.add_argument("--runs", type=int, default=5, help="startup: cold starts to time")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Array-backed export of the cost model pipeline.
+
+The sklearn Pipeline (OneHotEncoder + RandomForestRegressor) is compiled
+into flat NumPy arrays:
+
+    feature, threshold, value   one entry per node, all trees
+    children                    two entries per node: [right, left]
+    roots                       first node of every tree
+
+and a per-column layout where each categorical column carries its
+category -> index map in place of the OneHotEncoder. Leaves point to
+themselves, so every row walks every tree for `max_depth` steps with a few
+vectorized gathers and no Python per-node work; the next node is
+children[2 * node + (x <= threshold)].
+
+On disk it is a directory of .npy files plus layout.json, so the arrays can
+be memory-mapped and shared between worker processes.
+"""
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+LAYOUT_FILENAME = "layout.json"
+NODE_ARRAYS = ("children", "feature", "threshold", "value", "roots")
+FORMAT_VERSION = 1
+
+# Rows traversed together; keeps the (rows x trees) node matrix cache-sized
+PREDICT_CHUNK_ROWS = 256
+
+
+class CompactCostModel:
+    def __init__(self, columns: List[Dict], n_features: int, max_depth: int, arrays: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.n_features = n_features
+        self.max_depth = max_depth
+        self.arrays = arrays
+        for name in NODE_ARRAYS:
+            setattr(self, name, arrays[name])
+        # category -> feature column of its one-hot bit, precomputed once
+        self._position = {
+            col["name"]: {category: col["offset"] + i for i, category in enumerate(col["categories"])}
+            for col in columns
+            if col["kind"] == "onehot"
+        }
+
+    @property
+    def vocabulary(self) -> Dict[str, List[str]]:
+        return {col["name"]: col["categories"] for col in self.columns if col["kind"] == "onehot"}
+
+    # ---------- inference ----------
+
+    def encode(self, df) -> np.ndarray:
+        """Dense float32 feature matrix, laid out like the fitted ColumnTransformer."""
+        return self._encode(len(df), lambda name: df[name].to_numpy())
+
+    def encode_records(self, records: Sequence[tuple], columns: Sequence[str]) -> np.ndarray:
+        """Same as encode() for row tuples in `columns` order, without building a DataFrame."""
+        index = {name: i for i, name in enumerate(columns)}
+        return self._encode(len(records), lambda name: [r[index[name]] for r in records])
+
+    def _encode(self, n_rows: int, column_values: Callable[[str], Sequence]) -> np.ndarray:
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        for col in self.columns:
+            values = column_values(col["name"])
+            if col["kind"] == "numeric":
+                X[:, col["offset"]] = values
+                continue
+            position = self._position[col["name"]]
+            # Unknown categories stay all-zero (handle_unknown="ignore")
+            features = np.fromiter((position.get(v, -1) for v in values), dtype=np.int64, count=n_rows)
+            rows = np.flatnonzero(features >= 0)
+            X[rows, features[rows]] = 1.0
+        return X
+
+    def predict(self, df) -> np.ndarray:
+        return self._predict_chunked(self.encode(df))
+
+    def predict_records(self, records: Sequence[tuple], columns: Sequence[str]) -> np.ndarray:
+        return self._predict_chunked(self.encode_records(records, columns))
+
+    def _predict_chunked(self, X: np.ndarray) -> np.ndarray:
+        if len(X) <= PREDICT_CHUNK_ROWS:
+            return self._predict_encoded(X)
+        return np.concatenate([
+            self._predict_encoded(X[start:start + PREDICT_CHUNK_ROWS])
+            for start in range(0, len(X), PREDICT_CHUNK_ROWS)
+        ])
+
+    def _predict_encoded(self, X: np.ndarray) -> np.ndarray:
+        flat = X.ravel()
+        row_start = (np.arange(len(X)) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = flat[row_start + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[nodes * 2 + go_left]
+        return self.value[nodes].mean(axis=1)
+
+    # ---------- persistence ----------
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in NODE_ARRAYS:
+            np.save(directory / f"{name}.npy", self.arrays[name])
+        layout = {
+            "format_version": FORMAT_VERSION,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "columns": self.columns,
+        }
+        (directory / LAYOUT_FILENAME).write_text(json.dumps(layout, indent=2))
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "CompactCostModel":
+        directory = Path(directory)
+        layout = json.loads((directory / LAYOUT_FILENAME).read_text())
+        if layout.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format: {layout.get('format_version')}")
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in NODE_ARRAYS
+        }
+        return cls(layout["columns"], layout["n_features"], layout["max_depth"], arrays)
+
+
+def _column_layout(preprocessor) -> List[Dict]:
+    columns = []
+    for name, transformer, features in preprocessor.transformers_:
+        if name == "remainder" and transformer == "drop":
+            continue
+        offset = preprocessor.output_indices_[name].start
+        if hasattr(transformer, "categories_"):
+            if getattr(transformer, "drop", None) is not None:
+                raise ValueError("OneHotEncoder with drop= is not supported")
+            for feature, categories in zip(features, transformer.categories_):
+                if any(not isinstance(c, str) for c in categories):
+                    raise ValueError(f"Non-string categories in {feature} are not supported")
+                columns.append({
+                    "name": feature,
+                    "kind": "onehot",
+                    "offset": offset,
+                    "categories": [str(c) for c in categories],
+                })
+                offset += len(categories)
+        elif transformer == "passthrough" or type(transformer).__name__ == "FunctionTransformer":
+            if getattr(transformer, "func", None) is not None:
+                raise ValueError(f"Transformer {name} is not an identity passthrough")
+            for feature in features:
+                columns.append({"name": feature, "kind": "numeric", "offset": offset})
+                offset += 1
+        else:
+            raise ValueError(f"Unsupported transformer in pipeline: {name}")
+    return columns
+
+
+def export_pipeline(pipeline) -> CompactCostModel:
+    """
+    Compile a fitted Pipeline(preprocessor=ColumnTransformer, model=RandomForestRegressor)
+    into a CompactCostModel. Raises ValueError for pipelines it can't represent.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    forest = pipeline.named_steps["model"]
+    if getattr(forest, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests are supported")
+
+    children, feature, threshold, value, roots = [], [], [], [], []
+    start = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        local = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Leaves loop back to themselves so traversal can run a fixed number of steps
+        left = np.where(is_leaf, local, tree.children_left) + start
+        right = np.where(is_leaf, local, tree.children_right) + start
+        children.append(np.column_stack([right, left]).ravel())
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value.append(tree.value[:, 0, 0])
+        roots.append(start)
+        start += tree.node_count
+
+    arrays = {
+        "children": np.concatenate(children).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    return CompactCostModel(
+        columns=_column_layout(preprocessor),
+        n_features=int(forest.n_features_in_),
+        max_depth=max(int(e.tree_.max_depth) for e in forest.estimators_),
+        arrays=arrays,
+    )
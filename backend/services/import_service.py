@@ -0,0 +1,133 @@
+import logging
+from typing import IO, TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from constants import IMPORT_CHUNK_SIZE, IMPORT_MAX_REPORTED_ERRORS
+from models.data_models import VehicleServiceLog
+from services.service import Service
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EXCEL_CONTENT_TYPES = {
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+CSV_CONTENT_TYPES = {"text/csv"}
+
+# Header aliases seen in workshop exports
+COLUMN_ALIASES = {
+    "vehicle_type": "vehicle_model",
+    "model": "vehicle_model",
+    "owner": "owner_name",
+    "phone": "owner_phone_number",
+    "owner_phone": "owner_phone_number",
+    "mechanic": "mechanic_name",
+    "service_cost": "cost",
+}
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _normalize_column(name: Any) -> str:
+    key = str(name).strip().lower().replace(" ", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _iter_chunks(file: IO[bytes], content_type: str, chunk_size: int) -> Iterator["pd.DataFrame"]:
+    """
+    Yield DataFrame chunks of at most chunk_size rows, every cell as a string
+    (pydantic does the typed coercion). CSV is parsed incrementally; Excel
+    workbooks can't be streamed by pandas, so they are read once and sliced.
+    """
+    import pandas as pd  # deferred: keeps pandas out of app startup
+
+    if content_type in CSV_CONTENT_TYPES:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunk_size)
+        return
+
+    df = pd.read_excel(file, dtype=str)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def _coerce_chunk(chunk: "pd.DataFrame", first_row: int, errors: List[dict]) -> List[VehicleServiceLog]:
+    """Validate a chunk into VehicleServiceLog models, recording per-row errors."""
+    chunk = chunk.rename(columns=_normalize_column)
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+
+    logs = []
+    for offset, record in enumerate(chunk.to_dict("records")):
+        try:
+            logs.append(VehicleServiceLog.model_validate(record))
+        except ValidationError as e:
+            errors.append({
+                "row": first_row + offset,
+                "error": e.errors(include_url=False, include_input=False),
+            })
+    return logs
+
+
+async def import_service_logs(
+    file: IO[bytes],
+    content_type: str,
+    service: Service,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Stream a CSV/Excel export into vehicle_service_logs chunk by chunk, so only
+    one chunk is in memory at a time. Each chunk is validated and bulk-inserted
+    in its own transaction. Parsing and validation run in the threadpool to
+    keep the event loop free.
+
+    `row` numbers in errors are 1-based data rows (header excluded). At most
+    IMPORT_MAX_REPORTED_ERRORS errors are returned; `failed` counts them all.
+    `on_progress` gets the running counts and the errors so far after every chunk.
+    """
+    if content_type not in CSV_CONTENT_TYPES | EXCEL_CONTENT_TYPES:
+        raise ValueError(f"Unsupported content type for import: {content_type}")
+
+    chunks = _iter_chunks(file, content_type, chunk_size)
+    progress = {"rows_read": 0, "inserted": 0, "failed": 0, "chunks": 0}
+    reported_errors: List[dict] = []
+
+    while True:
+        chunk = await run_in_threadpool(next, chunks, None)
+        if chunk is None:
+            break
+
+        chunk_errors: List[dict] = []
+        first_row = progress["rows_read"] + 1
+        logs = await run_in_threadpool(_coerce_chunk, chunk, first_row, chunk_errors)
+
+        invalid_rows = {e["row"] for e in chunk_errors}
+        positions = [
+            row for row in range(first_row, first_row + len(chunk))
+            if row not in invalid_rows
+        ]
+        result = await service.create_vehicle_service_logs_bulk(logs)
+        for err in result["errors"]:
+            chunk_errors.append({"row": positions[err["index"]], "error": err["error"]})
+
+        progress["rows_read"] += len(chunk)
+        progress["inserted"] += result["inserted"]
+        progress["failed"] += len(chunk_errors)
+        progress["chunks"] += 1
+
+        room = IMPORT_MAX_REPORTED_ERRORS - len(reported_errors)
+        if room > 0:
+            reported_errors.extend(sorted(chunk_errors, key=lambda e: e["row"])[:room])
+
+        logger.info(
+            "Import progress: %d rows read, %d inserted, %d failed",
+            progress["rows_read"], progress["inserted"], progress["failed"],
+        )
+        if on_progress:
+            await on_progress({**progress, "errors": list(reported_errors)})
+
+    return {**progress, "errors": reported_errors}
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from typing import IO, Dict, List, NamedTuple, Optional
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+
+from constants import DB_NAME, IMPORT_CHUNK_SIZE, IMPORT_JOB_QUEUE_SIZE, IMPORT_JOB_WORKERS
+from models.data_models import ImportJob
+from repos.repo import Repo
+from services.import_service import import_service_logs
+from services.service import Service
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the import queue has no room for another job."""
+
+
+class _QueuedImport(NamedTuple):
+    job_id: str
+    path: str
+    content_type: str
+    chunk_size: int
+
+
+class ImportJobQueue:
+    """
+    In-process background runner for file imports.
+
+    Uploads are copied to a private temp file and queued; a fixed number of
+    worker tasks (bounded concurrency) drain the queue and run the streaming
+    import, writing progress to the import_jobs table for GET /jobs/{id}.
+    Jobs can be cancelled while queued or running; chunks already committed
+    by a cancelled import stay in the database.
+    """
+
+    def __init__(
+        self,
+        repo: Repo,
+        workers: int = IMPORT_JOB_WORKERS,
+        max_queued: int = IMPORT_JOB_QUEUE_SIZE,
+    ):
+        self.repo = repo
+        self.service = Service(repo)
+        self.workers = workers
+        self.max_queued = max_queued
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        if self._worker_tasks:
+            return
+        interrupted = await self.repo.fail_unfinished_jobs("Interrupted by server restart")
+        if interrupted:
+            logger.warning("Marked %d unfinished import job(s) as failed", interrupted)
+
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"import-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        # Anything still queued will never run; don't leave temp files behind
+        while self._queue is not None and not self._queue.empty():
+            item = self._queue.get_nowait()
+            await self.repo.update_job(item.job_id, status="cancelled", message="Server shutting down")
+            self._remove(item.path)
+        self._queue = None
+
+    # ---------- public API ----------
+
+    async def submit(
+        self,
+        file: IO[bytes],
+        filename: Optional[str],
+        content_type: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> ImportJob:
+        """Queue an import of `file`. Returns the new job immediately."""
+        await self.start()
+        if self._queue.full():
+            raise QueueFullError("Import queue is full, try again later")
+
+        path = await run_in_threadpool(self._spool, file)
+        job_id = str(uuid4())
+        job = await self.repo.create_job(job_id, "file_import", filename)
+        try:
+            self._queue.put_nowait(_QueuedImport(job_id, path, content_type, chunk_size))
+        except asyncio.QueueFull:
+            await self.repo.update_job(job_id, status="failed", message="Import queue is full")
+            self._remove(path)
+            raise QueueFullError("Import queue is full, try again later")
+        return job
+
+    async def get(self, job_id: str) -> Optional[ImportJob]:
+        return await self.repo.get_job(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[ImportJob]:
+        job = await self.repo.get_job(job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return job
+
+        self._cancelled.add(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        await self.repo.update_job(job_id, status="cancelled", message="Cancelled by request")
+        return await self.repo.get_job(job_id)
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _spool(file: IO[bytes]) -> str:
+        """Copy the upload to a temp file that outlives the request."""
+        fd, path = tempfile.mkstemp(prefix="import_", suffix=".upload")
+        with os.fdopen(fd, "wb") as out:
+            file.seek(0)
+            shutil.copyfileobj(file, out, length=1024 * 1024)
+        return path
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                if item.job_id in self._cancelled:
+                    continue
+                task = asyncio.create_task(self._run(item))
+                self._running[item.job_id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    if item.job_id not in self._cancelled:
+                        raise  # worker itself is shutting down
+                except Exception as e:
+                    # Import errors and failed job-table writes alike: fail this
+                    # job and keep the worker alive for the rest of the queue
+                    logger.exception(f"Import job {item.job_id} failed: {e}")
+                    await self._mark_failed(item.job_id, str(e))
+            finally:
+                self._running.pop(item.job_id, None)
+                self._cancelled.discard(item.job_id)
+                self._remove(item.path)
+                self._queue.task_done()
+
+    async def _run(self, item: _QueuedImport) -> None:
+        await self.repo.update_job(item.job_id, unless_status="cancelled", status="running")
+
+        async def on_progress(progress: dict) -> None:
+            # Errors go out with the counts so they are visible while the job runs
+            await self.repo.update_job(
+                item.job_id,
+                rows_read=progress["rows_read"],
+                inserted=progress["inserted"],
+                failed=progress["failed"],
+                errors=progress["errors"],
+            )
+
+        with open(item.path, "rb") as f:
+            result = await import_service_logs(
+                f, item.content_type, self.service, item.chunk_size, on_progress
+            )
+
+        await self.repo.update_job(
+            item.job_id,
+            unless_status="cancelled",
+            status="succeeded",
+            rows_read=result["rows_read"],
+            inserted=result["inserted"],
+            failed=result["failed"],
+            errors=result["errors"],
+            message=f"Imported {result['inserted']} of {result['rows_read']} records",
+        )
+
+    async def _mark_failed(self, job_id: str, message: str) -> None:
+        try:
+            await self.repo.update_job(job_id, unless_status="cancelled", status="failed", message=message)
+        except Exception as e:
+            logger.error(f"Could not mark import job {job_id} as failed: {e}")
+
+
+# Single shared instance
+import_jobs = ImportJobQueue(Repo(DB_NAME))
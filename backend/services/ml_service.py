@@ -1,32 +1,321 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
-import joblib
-import pandas as pd
+import numpy as np
 
+from constants import (
+    ML_BATCH_MAX_SIZE,
+    ML_BATCH_MAX_WAIT_MS,
+    ML_CACHE_MILEAGE_BUCKET_KM,
+    ML_CACHE_SIZE,
+    ML_CACHE_TTL_SECONDS,
+    ML_INFERENCE_QUEUE_SIZE,
+    ML_INFERENCE_WORKERS,
+    ML_COMPACT_MODEL,
+    ML_LOG_SAMPLE_RATE,
+    ML_MODEL_MMAP,
+    ML_MODEL_WATCH_INTERVAL,
+)
+from services.compact_model import CompactCostModel, export_pipeline
+from services.model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
 
 # Resolve backend root: .../backend/ from this file
 BACKEND_DIR = Path(__file__).resolve().parents[1]
 MODEL_PATH = BACKEND_DIR / "ml" / "service_cost_model.pkl"
 
+# Feature order of the cache keys; must match the training script's columns
+FEATURE_COLUMNS = ("vehicle_model", "service_type", "mileage", "mechanic_name")
+
+
+class PredictionMonitor:
+    """
+    Cheap, thread-safe observability for the prediction hot path.
+
+    Every predict call updates counters and a fixed-bucket latency
+    histogram in memory. Only one in `sample_rate` calls is logged, and the
+    feature summary for it is built only when DEBUG is enabled for this
+    logger, so normal traffic does no per-request I/O.
+    """
+
+    # Upper bounds (ms) of the latency histogram buckets; the last is open-ended
+    LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, sample_rate: int = ML_LOG_SAMPLE_RATE):
+        self.sample_rate = max(1, sample_rate)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._rows = 0
+        self._total_seconds = 0.0
+        self._buckets = [0] * (len(self.LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, rows: List[Tuple], seconds: float) -> None:
+        """`rows` are feature tuples in FEATURE_COLUMNS order."""
+        latency_ms = seconds * 1000
+        with self._lock:
+            self._calls += 1
+            self._rows += len(rows)
+            self._total_seconds += seconds
+            self._buckets[bisect.bisect_left(self.LATENCY_BUCKETS_MS, latency_ms)] += 1
+            sampled = self._calls % self.sample_rate == 0
+
+        if sampled and logger.isEnabledFor(logging.INFO):
+            logger.info("predict rows=%d latency_ms=%.2f", len(rows), latency_ms)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("predict features %s", self._feature_summary(rows))
+
+    @staticmethod
+    def _feature_summary(rows: List[Tuple]) -> Dict:
+        vehicle_models, service_types, mileages, _ = zip(*rows)
+        return {
+            "rows": len(rows),
+            "mileage_min": int(min(mileages)),
+            "mileage_max": int(max(mileages)),
+            "vehicle_models": dict(Counter(vehicle_models).most_common(5)),
+            "service_types": dict(Counter(service_types).most_common(5)),
+        }
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls, rows, total, buckets = self._calls, self._rows, self._total_seconds, list(self._buckets)
+        labels = [f"<={b}ms" for b in self.LATENCY_BUCKETS_MS] + [f">{self.LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "predict_calls": calls,
+            "rows_predicted": rows,
+            "avg_latency_ms": round(total / calls * 1000, 3) if calls else 0.0,
+            "latency_histogram": dict(zip(labels, buckets)),
+        }
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a TTL for cost estimates, keyed by
+    (vehicle_model, service_type, mileage bucket, mechanic_name).
+    """
+
+    def __init__(self, max_size: int = ML_CACHE_SIZE, ttl_seconds: float = ML_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, count: bool = True) -> Optional[Dict]:
+        """Cached value or None. count=False re-checks a key without touching hits/misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: Tuple, value: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
 
 class MLService:
-    def __init__(self):
-        self.model = None
+    def __init__(self, mileage_bucket_km: int = ML_CACHE_MILEAGE_BUCKET_KM):
+        # (model, version, metadata) swapped as one reference so in-flight
+        # predictions keep using the model they started with
+        self._active: Tuple = (None, None, {})
+        self._reload_lock: Optional[asyncio.Lock] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self.registry = ModelRegistry()
+        self.monitor = PredictionMonitor()
+        self.cache = PredictionCache()
+        self.executor = InferenceExecutor()
+        self.mileage_bucket_km = max(1, mileage_bucket_km)
+        # not_loaded -> loading -> ready | unavailable
+        self.status = "not_loaded"
+        self._load_task: Optional[asyncio.Task] = None
         print(f"[ML] ml_service loaded from: {__file__}")
-        print(f"[ML] Looking for model at: {MODEL_PATH}")
-        if MODEL_PATH.exists():
-            try:
-                self.model = joblib.load(MODEL_PATH)
-                print(f"[ML] Loaded cost model from {MODEL_PATH}")
-            except Exception as e:
-                print(f"[ML] Error loading model from {MODEL_PATH}: {e}")
+
+    @property
+    def model(self):
+        return self._active[0]
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._active[1]
+
+    @property
+    def model_metadata(self) -> Dict:
+        return self._active[2]
+
+    def load(self) -> bool:
+        """
+        Load the registry's ACTIVE version, or the legacy MODEL_PATH when the
+        registry is empty. Blocking; the app calls it via start_loading().
+        """
+        self.status = "loading"
+        version = self.registry.active_version()
+        if version:
+            print(f"[ML] Using registry version {version} from {self.registry.root}")
+            loaded = self.load_model(self._version_path(version), version, self.registry.metadata(version))
+        elif MODEL_PATH.exists():
+            print(f"[ML] Looking for model at: {MODEL_PATH}")
+            loaded = self.load_model(MODEL_PATH)
         else:
             print(f"[ML] Model file not found at {MODEL_PATH}. Train it first.")
+            loaded = False
+        self.status = "ready" if loaded else "unavailable"
+        return loaded
+
+    def start_loading(self) -> None:
+        """
+        Warm the model in a background thread so the server accepts requests
+        immediately; estimate endpoints report the model as loading until
+        it is ready.
+        """
+        if self._load_task is None:
+            self.status = "loading"
+            self._load_task = asyncio.create_task(asyncio.to_thread(self.load))
+
+    async def wait_until_loaded(self) -> bool:
+        if self._load_task is not None:
+            await self._load_task
+        return self.is_ready()
+
+    def _version_path(self, version: str) -> Path:
+        if ML_COMPACT_MODEL:
+            compact = self.registry.compact_model_path(version)
+            if compact is not None:
+                return compact
+        return self.registry.model_path(version)
+
+    def load_model(self, path: Path, version: Optional[str] = None, metadata: Optional[Dict] = None) -> bool:
+        """
+        Load a model and swap it in atomically, dropping every cached
+        estimate from the old one.
+
+        `path` is either a compact export directory or a pickled sklearn
+        Pipeline; with ML_MODEL_MMAP the arrays of either are memory-mapped
+        so worker processes share them. A pickle is compiled to the compact
+        form on load when ML_COMPACT_MODEL is on, falling back to the
+        Pipeline if it can't be represented.
+        """
+        path = Path(path)
+        try:
+            if path.is_dir():
+                model = CompactCostModel.load(path, mmap=ML_MODEL_MMAP)
+            else:
+                import joblib  # deferred: only needed once a pickle is actually loaded
+
+                model = joblib.load(path, mmap_mode="r" if ML_MODEL_MMAP else None)
+                if ML_COMPACT_MODEL:
+                    try:
+                        model = export_pipeline(model)
+                    except (ValueError, AttributeError, KeyError) as e:
+                        print(f"[ML] Serving sklearn pipeline, compact export not possible: {e}")
+        except Exception as e:
+            print(f"[ML] Error loading model from {path}: {e}")
+            return False
+        self._active = (model, version, metadata or {})
+        self.cache.clear()
+        print(f"[ML] Loaded cost model from {path} ({type(model).__name__})")
+        return True
+
+    async def reload(self, version: Optional[str] = None) -> Dict:
+        """
+        Activate `version` (or re-read the registry's ACTIVE pointer) and
+        swap the served model without downtime; loading runs in a thread.
+        """
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        if self._load_task is not None:
+            await self._load_task  # don't race the startup load
+        async with self._reload_lock:
+            if version is not None:
+                self.registry.activate(version)
+            version = self.registry.active_version()
+            if version is None:
+                raise KeyError("No active model version in the registry")
+
+            loaded = await asyncio.to_thread(
+                self.load_model,
+                self._version_path(version),
+                version,
+                self.registry.metadata(version),
+            )
+            if not loaded:
+                raise RuntimeError(f"Failed to load model version {version}")
+            self.status = "ready"
+            return self.model_metadata
+
+    def start_watcher(self, interval: float = ML_MODEL_WATCH_INTERVAL) -> None:
+        """Poll the registry's ACTIVE pointer and hot-swap when it changes."""
+        if interval <= 0 or self._watch_task is not None:
+            return
+
+        async def watch():
+            while True:
+                await asyncio.sleep(interval)
+                version = self.registry.active_version()
+                if version and version != self.model_version:
+                    try:
+                        await self.reload()
+                        logger.info("Hot-swapped cost model to version %s", version)
+                    except Exception as e:
+                        logger.error("Failed to hot-swap cost model to %s: %s", version, e)
+
+        self._watch_task = asyncio.create_task(watch())
 
     def is_ready(self) -> bool:
         return self.model is not None
 
+    def _cache_key(self, item: Dict) -> Tuple:
+        """
+        Mileage is snapped to the middle of its bucket, and the model is run
+        on that snapped value, so every request in a bucket gets the same
+        (cacheable) answer. A bucket of 1 km keeps exact mileage.
+        """
+        size = self.mileage_bucket_km
+        mileage = int(item["mileage"] or 0)
+        if size > 1:
+            mileage = (mileage // size) * size + size // 2
+        return (
+            item["vehicle_model"],
+            item["service_type"],
+            mileage,
+            item.get("mechanic_name") or "",
+        )
+
     def estimate_cost(
         self,
         vehicle_model: str,
@@ -43,35 +332,201 @@ class MLService:
         - mileage (int)
         - mechanic_name (str, can be empty)
         """
-        if not self.model:
+        return self.estimate_costs_batch([{
+            "vehicle_model": vehicle_model,
+            "service_type": service_type,
+            "mileage": mileage,
+            "mechanic_name": mechanic_name,
+        }])[0]
+
+    def estimate_costs_batch(self, items: List[Dict], count_lookups: bool = True) -> List[Dict]:
+        """
+        Predict costs for many rows with a single vectorized predict call.
+
+        Each item has the same keys as estimate_cost's arguments
+        (vehicle_model, service_type, mileage, mechanic_name optional).
+        Results are returned in input order, in estimate_cost's format.
+        Cached rows are answered from the cache; only distinct misses are
+        sent to the model. count_lookups=False leaves the cache hit/miss
+        counters alone for callers that already counted these lookups.
+        """
+        model = self.model
+        if not model:
             raise RuntimeError("ML model not loaded")
 
-        # Build a DataFrame with the SAME column names as training
-        df = pd.DataFrame(
-            [
-                {
-                    "vehicle_model": vehicle_model,
-                    "service_type": service_type,
-                    "mileage": mileage,
-                    "mechanic_name": mechanic_name or "",
-                }
-            ]
-        )
+        keys = [self._cache_key(item) for item in items]
+        results: List[Optional[Dict]] = [self.cache.get(key, count=count_lookups) for key in keys]
+        misses = list(dict.fromkeys(key for key, result in zip(keys, results) if result is None))
+        if not misses:
+            return results
 
-        print("[ML] Predict input DataFrame:")
-        print(df)
-        print("[ML] dtypes:", df.dtypes)
+        started = time.perf_counter()
+        if isinstance(model, CompactCostModel):
+            # Strings go straight to one-hot positions via the model's vocabulary dict
+            preds = model.predict_records(misses, FEATURE_COLUMNS)
+        else:
+            import pandas as pd  # deferred: only the sklearn Pipeline needs a DataFrame
 
-        pred = float(self.model.predict(df)[0])
+            # Build a DataFrame with the SAME column names as training
+            preds = model.predict(pd.DataFrame(misses, columns=FEATURE_COLUMNS))
+        preds = np.asarray(preds, dtype=float)
+        self.monitor.record(misses, time.perf_counter() - started)
+        predicted = np.round(preds).astype(int)
+        low = np.round(preds * 0.9).astype(int)
+        high = np.round(preds * 1.1).astype(int)
 
-        low = round(pred * 0.9)
-        high = round(pred * 1.1)
+        computed = {}
+        for key, p, lo, hi in zip(misses, predicted, low, high):
+            computed[key] = {
+                "predicted_cost": int(p),
+                "range_low": int(lo),
+                "range_high": int(hi),
+            }
+            if model is self.model:  # don't cache answers from a model swapped out mid-call
+                self.cache.put(key, computed[key])
 
-        return {
-            "predicted_cost": round(pred),
-            "range_low": low,
-            "range_high": high,
+        return [
+            result if result is not None else dict(computed[key])
+            for key, result in zip(keys, results)
+        ]
+
+    async def estimate_cost_coalesced(
+        self,
+        vehicle_model: str,
+        service_type: str,
+        mileage: int,
+        mechanic_name: Optional[str] = None,
+    ) -> Dict:
+        """
+        Single estimate that is coalesced with other concurrent requests
+        arriving within ML_BATCH_MAX_WAIT_MS into one batch predict.
+        """
+        if not self.model:
+            raise RuntimeError("ML model not loaded")
+        item = {
+            "vehicle_model": vehicle_model,
+            "service_type": service_type,
+            "mileage": mileage,
+            "mechanic_name": mechanic_name,
         }
+        # Cache hits skip the batching window entirely
+        cached = self.cache.get(self._cache_key(item))
+        if cached is not None:
+            return cached
+        return await self._batcher.submit(item)
+
+    async def estimate_costs_batch_async(self, items: List[Dict], count_lookups: bool = True) -> List[Dict]:
+        """estimate_costs_batch run on the inference pool, off the event loop."""
+        return await self.executor.run(self.estimate_costs_batch, items, count_lookups)
+
+    @property
+    def _batcher(self) -> "MicroBatcher":
+        if getattr(self, "_micro_batcher", None) is None:
+            # estimate_cost_coalesced already counted each item's cache lookup
+            self._micro_batcher = MicroBatcher(
+                lambda items: self.estimate_costs_batch_async(items, count_lookups=False)
+            )
+        return self._micro_batcher
+
+    def shutdown(self) -> None:
+        if self._load_task is not None and not self._load_task.done():
+            self._load_task.cancel()
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        self.executor.shutdown()
+
+
+class InferenceSaturatedError(RuntimeError):
+    """Raised when the inference pool already has its maximum work queued."""
+
+
+class InferenceExecutor:
+    """
+    Dedicated thread pool for model inference, so sklearn's predict never
+    runs on the event loop. At most `max_pending` calls may be running or
+    waiting at once; beyond that `run` fails fast with
+    InferenceSaturatedError (mapped to 503 by the API) instead of letting
+    latency grow without bound.
+    """
+
+    def __init__(self, workers: int = ML_INFERENCE_WORKERS, max_pending: int = ML_INFERENCE_QUEUE_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, fn: Callable, *args):
+        if self._pending >= self.max_pending:
+            raise InferenceSaturatedError("Cost estimation is busy, try again shortly")
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ml-inference")
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently and runs them through one batch
+    call: a batch is flushed when it reaches `max_batch_size` items or
+    `max_wait_ms` after its first item arrived, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Dict]], Awaitable[List[Dict]]],
+        max_batch_size: int = ML_BATCH_MAX_SIZE,
+        max_wait_ms: float = ML_BATCH_MAX_WAIT_MS,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; hold running batches here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Dict) -> Dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict, asyncio.Future]]) -> None:
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
 
 # Single shared instance
@@ -0,0 +1,97 @@
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Resolve backend root: .../backend/ from this file
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+REGISTRY_DIR = BACKEND_DIR / "ml" / "registry"
+
+MODEL_FILENAME = "model.pkl"
+COMPACT_DIRNAME = "model_compact"
+METADATA_FILENAME = "metadata.json"
+ACTIVE_FILENAME = "ACTIVE"
+
+# Version names are the UTC training timestamp written by ml/train_cost_model.py
+VERSION_PATTERN = re.compile(r"\d{8}T\d{6}")
+
+
+class ModelRegistry:
+    """
+    Versioned cost-model artifacts on disk:
+
+        registry/
+            ACTIVE                  <- name of the version to serve
+            20250101T120000/
+                model.pkl
+                model_compact/      <- array-backed export (services/compact_model.py)
+                metadata.json       <- trained_at, r2, features, ...
+
+    ml/train_cost_model.py writes new versions; MLService serves the one
+    named in ACTIVE and hot-swaps when it changes.
+    """
+
+    def __init__(self, root: Path = REGISTRY_DIR):
+        self.root = Path(root)
+
+    def _version_dir(self, version: str) -> Path:
+        """
+        Directory of `version`. Versions come from API requests and the
+        ACTIVE file and lead to unpickling, so only plain timestamp names that
+        resolve inside the registry are accepted.
+        """
+        if not isinstance(version, str) or not VERSION_PATTERN.fullmatch(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+        path = self.root / version
+        if path.resolve().parent != self.root.resolve():
+            raise ValueError(f"Model version {version!r} is outside the registry")
+        return path
+
+    def list_versions(self) -> List[Dict]:
+        """Metadata of every registered version, oldest first."""
+        if not self.root.is_dir():
+            return []
+        return [
+            self.metadata(entry.name)
+            for entry in sorted(self.root.iterdir())
+            if self.has_version(entry.name)
+        ]
+
+    def has_version(self, version: str) -> bool:
+        try:
+            return (self._version_dir(version) / MODEL_FILENAME).exists()
+        except ValueError:
+            return False
+
+    def model_path(self, version: str) -> Path:
+        return self._version_dir(version) / MODEL_FILENAME
+
+    def compact_model_path(self, version: str) -> Optional[Path]:
+        path = self._version_dir(version) / COMPACT_DIRNAME
+        return path if path.is_dir() else None
+
+    def metadata(self, version: str) -> Dict:
+        path = self._version_dir(version) / METADATA_FILENAME
+        metadata = {}
+        if path.exists():
+            try:
+                metadata = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                metadata = {"metadata_error": str(e)}
+        return {**metadata, "version": version}
+
+    def active_version(self) -> Optional[str]:
+        try:
+            version = (self.root / ACTIVE_FILENAME).read_text().strip()
+        except OSError:
+            return None
+        return version if version and self.has_version(version) else None
+
+    def activate(self, version: str) -> None:
+        """Point ACTIVE at `version` atomically (write temp file, then rename)."""
+        if not self.has_version(version):
+            raise KeyError(f"Unknown model version: {version}")
+        tmp = self.root / f".{ACTIVE_FILENAME}.tmp"
+        tmp.write_text(version + "\n")
+        os.replace(tmp, self.root / ACTIVE_FILENAME)
@@ -1,7 +1,8 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 from fastapi import HTTPException
 from models.data_models import VehicleServiceLog, Mechanic
 from repos.repo import Repo
+from constants import BULK_INSERT_BATCH_SIZE
 
 class Service:
     def __init__(self, repo: Repo):
@@ -9,21 +10,39 @@ class Service:
 
     # Vehicle Service Log Methods
     async def create_vehicle_service_log(self, log: VehicleServiceLog) -> VehicleServiceLog:
-        await self.repo.init_db()
         if isinstance(log, dict):
             log = VehicleServiceLog(**log)
         return await self.repo.insert(log)
 
+    async def create_vehicle_service_logs_bulk(
+        self,
+        logs: Iterable[VehicleServiceLog],
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+    ) -> dict:
+        return await self.repo.insert_many(logs, batch_size)
+
     async def get_vehicle_service_logs(self, vehicle_id: Optional[str] = None) -> List[VehicleServiceLog]:
-        await self.repo.init_db()
         return await self.repo.list(vehicle_id)
 
+    async def get_vehicle_service_logs_page(
+        self,
+        vehicle_id: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 100,
+    ) -> Tuple[List[VehicleServiceLog], Optional[Tuple[str, str]]]:
+        return await self.repo.list_page(vehicle_id, after, limit)
+
+    def stream_vehicle_service_logs(
+        self,
+        vehicle_id: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> AsyncIterator[VehicleServiceLog]:
+        return self.repo.iter_logs(vehicle_id, after)
+
     async def get_vehicle_service_log_by_id(self, log_id: str) -> Optional[VehicleServiceLog]:
-        await self.repo.init_db()
         return await self.repo.get(log_id)
 
     async def update_vehicle_service_log(self, log_id: str, log: VehicleServiceLog) -> VehicleServiceLog:
-        await self.repo.init_db()
         if isinstance(log, dict):
             log = VehicleServiceLog(**log)
         
@@ -39,7 +58,6 @@ class Service:
         return log
 
     async def delete_vehicle_service_log(self, log_id: str) -> dict:
-        await self.repo.init_db()
         deleted_count = await self.repo.delete(log_id)
         if deleted_count == 0:
             raise HTTPException(status_code=404, detail="Vehicle service log not found to delete")
@@ -48,42 +66,47 @@ class Service:
     # Additional service methods
     async def get_services_by_vehicle_model(self, vehicle_model: str) -> List[VehicleServiceLog]:
         """Get all services for a specific vehicle model"""
-        await self.repo.init_db()
         return await self.repo.list_by_vehicle_model(vehicle_model)
 
     async def get_vehicles_due_soon(self, days_threshold: int = 30) -> List[VehicleServiceLog]:
         """Get vehicles with service due soon"""
-        await self.repo.init_db()
         return await self.repo.get_vehicles_due_soon(days_threshold)
 
+    async def get_overdue_services(self) -> List[VehicleServiceLog]:
+        """Get services whose next service date has passed"""
+        return await self.repo.get_overdue_services()
+
     async def update_service_cost_by_model(self, vehicle_model: str, new_cost: float) -> bool:
         """Update service cost for a vehicle model"""
-        await self.repo.init_db()
         return await self.repo.update_service_cost_by_model(vehicle_model, new_cost)
 
     async def delete_by_vehicle_model(self, vehicle_model: str) -> bool:
         """Delete all logs for a vehicle model"""
-        await self.repo.init_db()
         return await self.repo.delete_by_vehicle_model(vehicle_model)
 
+    # Aggregations
+    async def get_cost_summary(self) -> dict:
+        """Count, total and average cost across all service logs"""
+        return await self.repo.get_cost_summary()
+
+    async def get_stats_by(self, column: str, skip_empty: bool = False) -> List[dict]:
+        """Count and total cost grouped by a log column"""
+        return await self.repo.get_stats_by(column, skip_empty)
+
     # Mechanic methods
     async def create_mechanic(self, mechanic: Mechanic) -> Mechanic:
-        await self.repo.init_db()
         if isinstance(mechanic, dict):
             mechanic = Mechanic(**mechanic)
         return await self.repo.create_mechanic(mechanic)
 
     async def get_mechanic(self, mechanic_id: str) -> Optional[Mechanic]:
-        await self.repo.init_db()
         return await self.repo.get_mechanic(mechanic_id)
 
     async def list_mechanics(self) -> List[Mechanic]:
-        await self.repo.init_db()
         return await self.repo.list_mechanics()
 
     # CHALLENGE 5: Add these methods for multi-modal support
     async def update_mechanic(self, mechanic_id: str, mechanic: Mechanic) -> Mechanic:
-        await self.repo.init_db()
         if isinstance(mechanic, dict):
             mechanic = Mechanic(**mechanic)
         
@@ -98,7 +121,6 @@ class Service:
         return updated_mechanic
 
     async def delete_mechanic(self, mechanic_id: str) -> dict:
-        await self.repo.init_db()
         success = await self.repo.delete_mechanic(mechanic_id)
         if not success:
             raise HTTPException(status_code=404, detail="Mechanic not found to delete")
@@ -106,10 +128,8 @@ class Service:
 
     async def get_mechanic_with_most_services(self):
         """Get mechanic who has completed the most services"""
-        await self.repo.init_db()
         return await self.repo.get_mechanic_with_most_services()
 
     async def get_mechanic_service_costs(self):
         """Get total cost of services performed by each mechanic"""
-        await self.repo.init_db()
         return await self.repo.get_mechanic_service_costs()
\ No newline at end of file
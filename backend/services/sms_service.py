@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+from constants import (
+    SMS_BACKOFF_BASE_SECONDS,
+    SMS_BURST,
+    SMS_CONCURRENCY,
+    SMS_MAX_ATTEMPTS,
+    SMS_RATE_PER_SECOND,
+    SMS_TRANSPORT,
+)
+
+try:
+    from twilio.base.exceptions import TwilioRestException
+    from twilio.rest import Client
+    TWILIO_AVAILABLE = True
+except Exception:
+    Client = None
+    TwilioRestException = None
+    TWILIO_AVAILABLE = False
+    print("Twilio package not installed; Twilio features disabled.")
+
+logger = logging.getLogger(__name__)
+
+
+class SmsSendError(Exception):
+    """Raised by a transport when a message could not be sent."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SmsMessage(NamedTuple):
+    to: str
+    body: str
+
+
+class SmsResult(NamedTuple):
+    status: str  # transport.sent_status ("sent", "sent_fake") or "error_sending: ..."
+    sid: Optional[str]
+    attempts: int
+
+
+# ---------- transports ----------
+
+class SmsTransport(ABC):
+    """Sends one message. Implementations raise SmsSendError on failure."""
+
+    name = "base"
+    # Status reported for a message this transport accepted
+    sent_status = "sent"
+
+    @abstractmethod
+    async def send(self, to: str, body: str) -> str:
+        """Send `body` to `to`; returns the provider's message id."""
+
+    def close(self) -> None:
+        pass
+
+
+class TwilioTransport(SmsTransport):
+    """
+    Twilio's client is blocking, so sends run on a private thread pool sized
+    to the sender's concurrency and never occupy the event loop or the
+    default executor.
+    """
+
+    name = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, max_workers: int = SMS_CONCURRENCY):
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="twilio-sms")
+
+    def _send(self, to: str, body: str) -> str:
+        try:
+            message = self.client.messages.create(body=body, from_=self.from_number, to=to)
+        except TwilioRestException as e:
+            # 429 / 5xx are throttling or outages; anything else (bad number, ...) won't succeed later
+            # status is None when Twilio never answered with an HTTP status
+            raise SmsSendError(str(e), retryable=e.status == 429 or (e.status or 0) >= 500)
+        except Exception as e:
+            raise SmsSendError(str(e))
+        if not message.sid:
+            raise SmsSendError("Twilio returned no message SID", retryable=False)
+        return message.sid
+
+    async def send(self, to: str, body: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._send, to, body)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class FakeSmsTransport(SmsTransport):
+    """
+    Local stand-in for a real provider: waits `latency` seconds per message,
+    fails a `failure_rate` fraction of attempts (retryably), logs and keeps
+    what it "sent" in `sent`. Nothing leaves the process.
+    """
+
+    name = "fake"
+    sent_status = "sent_fake"
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent: List[SmsMessage] = []
+
+    async def send(self, to: str, body: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise SmsSendError("Simulated provider failure")
+        self.sent.append(SmsMessage(to, body))
+        sid = f"FAKE{len(self.sent):08d}"
+        logger.info("Fake SMS %s to %s: %s", sid, to, body)
+        return sid
+
+
+def get_sms_transport() -> Optional[SmsTransport]:
+    """Transport selected by SMS_TRANSPORT, or None when Twilio isn't configured."""
+    if SMS_TRANSPORT == "fake":
+        return FakeSmsTransport()
+
+    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    from_number = os.getenv("TWILIO_FROM_NUMBER")
+    if not (TWILIO_AVAILABLE and account_sid and auth_token and from_number):
+        return None
+    return TwilioTransport(account_sid, auth_token, from_number)
+
+
+# ---------- sender ----------
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return  # unlimited
+        # The lock queues waiters FIFO, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ReminderSender:
+    """
+    Sends a batch of SMS through `transport` with at most `concurrency`
+    messages in flight and at most `rate_per_second` provider calls on
+    average (retries included). Retryable failures are retried up to
+    `max_attempts` with jittered exponential backoff; a failed message
+    never holds up the rest of the batch.
+    """
+
+    def __init__(
+        self,
+        transport: SmsTransport,
+        concurrency: int = SMS_CONCURRENCY,
+        rate_per_second: float = SMS_RATE_PER_SECOND,
+        burst: int = SMS_BURST,
+        max_attempts: int = SMS_MAX_ATTEMPTS,
+        backoff_base: float = SMS_BACKOFF_BASE_SECONDS,
+    ):
+        self.transport = transport
+        self.concurrency = max(1, concurrency)
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+
+    async def send_all(self, messages: Sequence[SmsMessage]) -> List[SmsResult]:
+        """Send every message; results are in the same order as `messages`."""
+        results: List[Optional[SmsResult]] = [None] * len(messages)
+        if not messages:
+            return []
+
+        bucket = TokenBucket(self.rate_per_second, self.burst)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(messages):
+            queue.put_nowait(item)
+
+        async def worker() -> None:
+            while not queue.empty():
+                index, message = queue.get_nowait()
+                results[index] = await self._send_one(message, bucket)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(messages)))))
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Sent %d SMS via %s in %.2fs (%.1f msg/s)",
+            sum(1 for r in results if r.status == self.transport.sent_status), self.transport.name, elapsed,
+            len(messages) / elapsed if elapsed else 0.0,
+        )
+        return results
+
+    async def _send_one(self, message: SmsMessage, bucket: TokenBucket) -> SmsResult:
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            try:
+                sid = await self.transport.send(message.to, message.body)
+                return SmsResult(self.transport.sent_status, sid, attempt)
+            except SmsSendError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    return SmsResult(f"error_sending: {e}", None, attempt)
+                logger.debug(f"SMS to {message.to} failed (attempt {attempt}), retrying: {e}")
+            except Exception as e:
+                # A transport bug must not fail the rest of the batch in send_all's gather
+                logger.exception(f"Unexpected error sending SMS to {message.to}: {e}")
+                return SmsResult(f"error_sending: {e}", None, attempt)
+            await asyncio.sleep(self.backoff_base * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import time
+from itertools import groupby
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from constants import (
+    DB_NAME,
+    WEBHOOK_BACKOFF_BASE_SECONDS,
+    WEBHOOK_BACKOFF_MAX_SECONDS,
+    WEBHOOK_BATCH_SIZE,
+    WEBHOOK_CONCURRENCY,
+    WEBHOOK_LEASE_SECONDS,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_POLL_INTERVAL_SECONDS,
+    WEBHOOK_TIMEOUT_SECONDS,
+)
+from models.data_models import WebhookMessage
+from repos.repo import Repo
+
+logger = logging.getLogger(__name__)
+
+# Client errors worth retrying; any other 4xx means the request itself is wrong
+RETRYABLE_STATUSES = {408, 425, 429}
+
+
+class WebhookDispatcher:
+    """
+    Delivers outbound webhooks through the durable webhook_outbox table.
+
+    `enqueue` stores the message and wakes a single worker task, which
+    leases due messages, POSTs them over one pooled keep-alive
+    aiohttp session (at most `concurrency` requests in flight) and records
+    the outcome. Failures are retried with jittered exponential backoff,
+    honoring Retry-After, until `max_attempts`; then the message is marked
+    'dead'. Delivery is at-least-once: a message whose lease expires
+    mid-send (e.g. the process died) is sent again.
+
+    With batch_size > 1 the receiver is assumed to accept
+    {"events": [payload, ...]} and messages for the same URL are grouped.
+    """
+
+    def __init__(
+        self,
+        repo: Repo,
+        concurrency: int = WEBHOOK_CONCURRENCY,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        backoff_base: float = WEBHOOK_BACKOFF_BASE_SECONDS,
+        backoff_max: float = WEBHOOK_BACKOFF_MAX_SECONDS,
+        poll_interval: float = WEBHOOK_POLL_INTERVAL_SECONDS,
+        timeout: float = WEBHOOK_TIMEOUT_SECONDS,
+        lease_seconds: float = WEBHOOK_LEASE_SECONDS,
+    ):
+        self.repo = repo
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._metrics: Dict[str, float] = dict.fromkeys(
+            ("enqueued", "requests", "delivered", "failed_attempts", "retries_scheduled", "dead", "request_seconds"),
+            0,
+        )
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="webhook-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ---------- public API ----------
+
+    async def enqueue(self, url: str, event: str, payload: dict) -> int:
+        """Persist a message for delivery; returns its outbox id."""
+        message_id = await self.repo.enqueue_webhook(url, event, payload)
+        self._metrics["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return message_id
+
+    async def stats(self) -> dict:
+        metrics = dict(self._metrics)
+        request_seconds = metrics.pop("request_seconds")
+        return {
+            **metrics,
+            "avg_request_ms": round(request_seconds / metrics["requests"] * 1000, 2) if metrics["requests"] else 0.0,
+            "outbox": await self.repo.count_webhooks_by_status(),
+        }
+
+    async def drain_once(self) -> int:
+        """Lease due messages and deliver them. Returns how many were claimed."""
+        messages = await self.repo.claim_due_webhooks(self.concurrency * self.batch_size, self.lease_seconds)
+        if not messages:
+            return 0
+
+        batches: List[List[WebhookMessage]] = []
+        for _, group in groupby(sorted(messages, key=lambda m: (m.url, m.id)), key=lambda m: m.url):
+            group = list(group)
+            batches.extend(group[i:i + self.batch_size] for i in range(0, len(group), self.batch_size))
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(batch: List[WebhookMessage]) -> None:
+            async with slots:
+                await self._deliver(batch)
+
+        await asyncio.gather(*(deliver(batch) for batch in batches))
+        return len(messages)
+
+    # ---------- internals ----------
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook dispatcher error: {e}")
+                claimed = 0
+
+            if not claimed:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        delay *= random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def _deliver(self, batch: List[WebhookMessage]) -> None:
+        url = batch[0].url
+        body = batch[0].payload if self.batch_size == 1 else {"events": [m.payload for m in batch]}
+        ids = [m.id for m in batch]
+
+        retryable, retry_after = True, None
+        started = time.perf_counter()
+        try:
+            async with self._session.post(url, json=body) as resp:
+                if resp.status < 400:
+                    error = None
+                else:
+                    error = f"HTTP {resp.status}: {(await resp.text())[:500]}"
+                    retryable = resp.status >= 500 or resp.status in RETRYABLE_STATUSES
+                    try:
+                        retry_after = float(resp.headers.get("Retry-After", ""))
+                    except ValueError:
+                        pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+        self._metrics["requests"] += 1
+        self._metrics["request_seconds"] += time.perf_counter() - started
+
+        if error is None:
+            await self.repo.mark_webhooks_delivered(ids)
+            self._metrics["delivered"] += len(batch)
+            return
+
+        self._metrics["failed_attempts"] += len(batch)
+        dead = [m.id for m in batch if not retryable or m.attempts + 1 >= self.max_attempts]
+        retry = [m for m in batch if m.id not in dead]
+        if dead:
+            await self.repo.mark_webhooks_failed(dead, error, None)
+            self._metrics["dead"] += len(dead)
+            logger.error(f"Giving up on webhook(s) {dead} to {url}: {error}")
+        if retry:
+            attempt = max(m.attempts for m in retry) + 1
+            next_attempt_at = time.time() + self._backoff(attempt, retry_after)
+            await self.repo.mark_webhooks_failed([m.id for m in retry], error, next_attempt_at)
+            self._metrics["retries_scheduled"] += len(retry)
+            logger.warning(f"Webhook delivery to {url} failed (attempt {attempt}), retrying: {error}")
+
+
+# Single shared instance
+webhook_dispatcher = WebhookDispatcher(Repo(DB_NAME))
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The app opens ./vehicle_service_logs.db relative to the working directory, and
+# the auth engine resolves that path when auth_db is imported. Move into a scratch
+# directory before any test module imports the app, so the bundled database is
+# never written to.
+os.chdir(tempfile.mkdtemp(prefix="backend_tests_"))
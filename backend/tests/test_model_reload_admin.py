@@ -0,0 +1,71 @@
+"""
+POST /vehicle_service_logs/estimate-cost/model/reload is admin only.
+
+Run from backend/:  python -m pytest -q tests
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.auth
+from auth_db import close_auth_db, init_auth_db
+from auth_security import shutdown_password_pool
+from routers import vehicle_service_logs
+from routers.auth import router as auth_router
+
+RELOAD_URL = "/vehicle_service_logs/estimate-cost/model/reload"
+ADMIN_TOKEN = "test-admin-token"
+# Well-formed but never registered, so a request past the admin gate gets 404
+UNKNOWN_VERSION = {"version": "20000101T000000"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # conftest.py has already moved the working directory (and with it the
+    # auth tables in ./vehicle_service_logs.db) into a scratch dir
+    monkeypatch.setattr(routers.auth, "ADMIN_API_TOKEN", ADMIN_TOKEN)
+
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(vehicle_service_logs.router, prefix="/vehicle_service_logs")
+    with TestClient(app) as c:
+        c.portal.call(init_auth_db)
+        yield c
+        c.portal.call(close_auth_db)
+    shutdown_password_pool()
+
+
+@pytest.fixture
+def user_headers(client, request):
+    # The scratch database is shared by the session; one account per test
+    credentials = {"email": f"{request.node.name}@example.com", "password": "not-an-admin-1"}
+    assert client.post("/auth/register", json=credentials).status_code == 200
+    token = client.post("/auth/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_reload_requires_login(client):
+    assert client.post(RELOAD_URL, json=UNKNOWN_VERSION).status_code == 401
+
+
+def test_ordinary_user_cannot_reload(client, user_headers):
+    response = client.post(RELOAD_URL, json=UNKNOWN_VERSION, headers=user_headers)
+    assert response.status_code == 403
+
+
+def test_wrong_admin_token_is_rejected(client, user_headers):
+    headers = {**user_headers, "X-Admin-Token": "guess"}
+    assert client.post(RELOAD_URL, json=UNKNOWN_VERSION, headers=headers).status_code == 403
+
+
+def test_admin_token_unset_closes_the_route(client, user_headers, monkeypatch):
+    monkeypatch.setattr(routers.auth, "ADMIN_API_TOKEN", "")
+    headers = {**user_headers, "X-Admin-Token": ""}
+    assert client.post(RELOAD_URL, json=UNKNOWN_VERSION, headers=headers).status_code == 403
+
+
+def test_admin_passes_the_gate(client, user_headers):
+    headers = {**user_headers, "X-Admin-Token": ADMIN_TOKEN}
+    response = client.post(RELOAD_URL, json=UNKNOWN_VERSION, headers=headers)
+    assert response.status_code == 404
+    assert "Unknown model version" in response.json()["detail"]
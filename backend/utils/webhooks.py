@@ -1,13 +1,15 @@
 import os
-import requests
+
+from services.webhook_service import webhook_dispatcher
 
 MAKE_WEBHOOK_URL = os.getenv("MAKE_WEBHOOK_URL")
 
 
-def send_make_webhook(email: str, full_name: str, user_id: int) -> None:
+async def send_make_webhook(email: str, full_name: str, user_id: int) -> None:
     """
-    Send a POST request to the Make webhook URL with new user data.
-    This runs as a background task; exceptions are caught and logged.
+    Queue a POST to the Make webhook URL with new user data.
+    The message is stored in the webhook outbox and delivered (with retries)
+    by the webhook dispatcher, so this only costs one local insert.
     """
     if not MAKE_WEBHOOK_URL:
         print("MAKE_WEBHOOK_URL not configured; skipping Make webhook.")
@@ -22,11 +24,4 @@ def send_make_webhook(email: str, full_name: str, user_id: int) -> None:
         },
     }
 
-    try:
-        resp = requests.post(MAKE_WEBHOOK_URL, json=payload, timeout=5)
-        if resp.status_code >= 400:
-            print(f"Make webhook returned status {resp.status_code}: {resp.text}")
-        else:
-            print(f"Make webhook delivered: {resp.status_code}")
-    except Exception as e:
-        print(f"Error sending Make webhook: {e}")
+    await webhook_dispatcher.enqueue(MAKE_WEBHOOK_URL, payload["event"], payload)
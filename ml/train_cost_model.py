@@ -1,81 +1,494 @@
+import argparse
+import sqlite3
 import pandas as pd
+from pandas.api.types import union_categoricals
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import RandomizedSearchCV, train_test_split
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import sys
+import time
 import joblib
+import numpy as np
 
 DATA_PATH = Path("synthetic_vehicle_service_logs.csv")
 MODEL_PATH = Path("service_cost_model.pkl")
 
-def load_data():
-    print("Loading data...")
-    df = pd.read_csv(DATA_PATH)
+# Versioned registry served by the backend (see backend/services/model_registry.py)
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+REGISTRY_DIR = BACKEND_DIR / "ml" / "registry"
 
-    # Drop rows with missing cost (just to be safe)
-    df = df.dropna(subset=["cost"])
+# The compact export format is shared with the backend's inference engine
+sys.path.insert(0, str(BACKEND_DIR))
+from services.compact_model import export_pipeline  # noqa: E402
+from services.model_registry import ModelRegistry  # noqa: E402
+
+# Max |compact - sklearn| prediction difference accepted on the test split
+EXPORT_TOLERANCE = 1e-6
+
+FEATURES = ["vehicle_model", "service_type", "mileage", "mechanic_name"]
+CATEGORICAL_FEATURES = ["vehicle_model", "service_type", "mechanic_name"]
+NUMERIC_FEATURES = ["mileage"]
+TARGET = "cost"
+
+# Production table read by --db, streamed in chunks of this many rows
+DB_TABLE = "vehicle_service_logs"
+SQLITE_CHUNK_SIZE = 100_000
+
+# SQLite rows are split by a hash of their rowid, so a row stays in the test
+# set across full and incremental runs and later runs can score on rows no
+# earlier version trained on
+HOLDOUT_HASH_MULTIPLIER = 2654435761
+HOLDOUT_HASH_BUCKETS = 2 ** 32
+
+# --incremental: fewer new rows than this is not worth a new version, and
+# older held-out rows (most recent first) scored alongside the new ones
+INCREMENTAL_MIN_ROWS = 500
+INCREMENTAL_EVAL_OLD_ROWS = 20_000
+
+# Candidates sampled by --search
+SEARCH_SPACE = {
+    "model__n_estimators": [100, 200, 400],
+    "model__max_depth": [8, 12, 16, 24],
+    "model__min_samples_leaf": [1, 2, 5, 10],
+    "model__max_features": [1.0, 0.5, "sqrt"],
+}
+
+@contextmanager
+def stage(name, timings):
+    """Time a training stage, print it and record it in `timings`."""
+    print(f"{name.capitalize()}...")
+    started = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - started, 3)
+    print(f"[timing] {name}: {timings[name]:.2f}s")
+
+def _categorical(series):
+    """
+    Categorical dtype (int codes + one copy of each string) for a text column.
+    Missing text is served as "" (see MLService._cache_key); train the same way.
+    """
+    series = series.astype("category")
+    if series.isna().any():
+        if "" not in series.cat.categories:
+            series = series.cat.add_categories([""])
+        series = series.fillna("")
+    return series
+
+def load_data(data_path=DATA_PATH):
+    print(f"Loading data from {data_path}...")
+    df = pd.read_csv(
+        data_path,
+        usecols=FEATURES + [TARGET],
+        dtype={**{col: "category" for col in CATEGORICAL_FEATURES}, TARGET: np.float64},
+    )
+
+    # Drop rows with missing cost/mileage (just to be safe)
+    df = df.dropna(subset=[TARGET, "mileage"])
+    for col in CATEGORICAL_FEATURES:
+        df[col] = _categorical(df[col])
+    df["mileage"] = df["mileage"].astype(np.int32)
 
     return df
 
-def preprocess_and_train(df):
-    print("Preparing data...")
+def build_vocabulary(df):
+    """Sorted category list per text column; fixes the one-hot layout of the model."""
+    return {col: sorted(str(c) for c in df[col].cat.categories) for col in CATEGORICAL_FEATURES}
 
-    features = [
-        "vehicle_model",
-        "service_type",
-        "mileage",
-        "mechanic_name",
-    ]
-    target = "cost"
+def _typed_chunk(chunk):
+    """Shrink a raw SQLite chunk: categoricals for text, int32 mileage."""
+    out = {}
+    for col in CATEGORICAL_FEATURES:
+        out[col] = _categorical(chunk[col])
+    out["mileage"] = chunk["mileage"].astype(np.int32)
+    out[TARGET] = chunk[TARGET].astype(np.float64)
+    out["row_id"] = chunk["row_id"].astype(np.int64)
+    return pd.DataFrame(out)
 
-    X = df[features]
-    y = df[target]
+def _holdout_sql(test_size):
+    """SQL predicate selecting the rowid-hash test rows (see holdout_mask)."""
+    threshold = int(test_size * HOLDOUT_HASH_BUCKETS)
+    return f"(rowid * {HOLDOUT_HASH_MULTIPLIER}) % {HOLDOUT_HASH_BUCKETS} < {threshold}"
 
-    # Train-test split (not super important for synthetic data, but good practice)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.15, random_state=42
+def holdout_mask(row_ids, test_size):
+    """True for rows in the test set; stable for a given rowid and test_size."""
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+    return (row_ids * HOLDOUT_HASH_MULTIPLIER) % HOLDOUT_HASH_BUCKETS < int(test_size * HOLDOUT_HASH_BUCKETS)
+
+def load_data_from_sqlite(db_path, chunk_size=SQLITE_CHUNK_SIZE, after_rowid=0):
+    """
+    Stream the feature columns and cost from the logs table, chunk_size rows
+    at a time, keeping only the compact typed form of each chunk so peak
+    memory is one raw chunk plus the categorical result.
+
+    Only rows with rowid > after_rowid are read (incremental training).
+    Returns (df, max_rowid) where max_rowid is the watermark for next time.
+    """
+    columns = ", ".join(FEATURES + [TARGET])
+    query = (
+        f"SELECT rowid AS row_id, {columns} FROM {DB_TABLE} "
+        f"WHERE rowid > ? AND cost IS NOT NULL AND mileage IS NOT NULL "
+        f"ORDER BY rowid"
     )
+    chunks = []
+    max_rowid = after_rowid
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for chunk in pd.read_sql_query(query, conn, params=(after_rowid,), chunksize=chunk_size):
+            if chunk.empty:
+                continue
+            max_rowid = int(chunk["row_id"].iloc[-1])
+            chunks.append(_typed_chunk(chunk))
+    finally:
+        conn.close()
+
+    if not chunks:
+        return _typed_chunk(pd.DataFrame(columns=["row_id"] + FEATURES + [TARGET])), max_rowid
 
-    print("Building pipeline...")
+    df = pd.DataFrame({
+        col: (
+            union_categoricals([c[col] for c in chunks])
+            if col in CATEGORICAL_FEATURES
+            else np.concatenate([c[col].to_numpy() for c in chunks])
+        )
+        for col in FEATURES + [TARGET, "row_id"]
+    })
+    return df, max_rowid
 
-    categorical_features = ["vehicle_model", "service_type", "mechanic_name"]
-    numeric_features = ["mileage"]
+def load_holdout_from_sqlite(db_path, up_to_rowid, test_size, limit=INCREMENTAL_EVAL_OLD_ROWS):
+    """
+    The most recent `limit` test-set rows with rowid <= up_to_rowid: rows
+    earlier versions held out, used to score an incrementally grown forest.
+    """
+    columns = ", ".join(FEATURES + [TARGET])
+    query = (
+        f"SELECT rowid AS row_id, {columns} FROM {DB_TABLE} "
+        f"WHERE rowid <= ? AND {_holdout_sql(test_size)} AND cost IS NOT NULL AND mileage IS NOT NULL "
+        f"ORDER BY rowid DESC LIMIT ?"
+    )
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return _typed_chunk(pd.read_sql_query(query, conn, params=(up_to_rowid, limit)))
+    finally:
+        conn.close()
+
+def split_rows(df, test_size, random_state):
+    """(X_train, X_test, y_train, y_test): by rowid hash for SQLite rows, random for CSV."""
+    if "row_id" in df:
+        test = holdout_mask(df["row_id"], test_size)
+        return df.loc[~test, FEATURES], df.loc[test, FEATURES], df.loc[~test, TARGET], df.loc[test, TARGET]
+    return train_test_split(df[FEATURES], df[TARGET], test_size=test_size, random_state=random_state)
 
+def build_pipeline(n_estimators=200, max_depth=12, n_jobs=None, random_state=42, vocabulary=None):
+    # With a vocabulary the encoder uses it as-is instead of re-deriving the
+    # categories from (every CV fold of) the data
+    categories = [vocabulary[col] for col in CATEGORICAL_FEATURES] if vocabulary else "auto"
     preprocessor = ColumnTransformer(
         transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_features),
-            ("num", "passthrough", numeric_features),
+            ("cat", OneHotEncoder(categories=categories, handle_unknown="ignore"), CATEGORICAL_FEATURES),
+            ("num", "passthrough", NUMERIC_FEATURES),
         ]
     )
 
     model = RandomForestRegressor(
-        n_estimators=200,
-        random_state=42,
-        max_depth=12
+        n_estimators=n_estimators,
+        random_state=random_state,
+        max_depth=max_depth,
+        n_jobs=n_jobs,
     )
 
-    pipeline = Pipeline(steps=[
+    return Pipeline(steps=[
         ("preprocessor", preprocessor),
         ("model", model)
     ])
 
-    print("Training model...")
-    pipeline.fit(X_train, y_train)
+def search_hyperparameters(X_train, y_train, n_iter, cv, n_jobs, random_state=42, vocabulary=None):
+    """
+    Randomized search over SEARCH_SPACE. Candidates x folds are fitted in a
+    joblib process pool of n_jobs workers, each forest single-threaded so the
+    pool isn't oversubscribed. Returns the best pipeline params and CV R².
+    """
+    search = RandomizedSearchCV(
+        build_pipeline(n_jobs=1, random_state=random_state, vocabulary=vocabulary),
+        SEARCH_SPACE,
+        n_iter=n_iter,
+        cv=cv,
+        scoring="r2",
+        n_jobs=n_jobs,
+        random_state=random_state,
+        refit=False,
+    )
+    search.fit(X_train, y_train)
+    print(f"Best CV R² score: {search.best_score_:.3f} with {search.best_params_}")
+    return search.best_params_, float(search.best_score_)
+
+def preprocess_and_train(df, n_jobs=-1, n_estimators=200, max_depth=12, search_iter=0, cv=3,
+                         test_size=0.15, random_state=42, timings=None):
+    timings = {} if timings is None else timings
+
+    with stage("preprocess", timings):
+        X = df[FEATURES]
+        y = df[TARGET]
+        vocabulary = build_vocabulary(df)
+
+        # Train-test split (not super important for synthetic data, but good practice)
+        X_train, X_test, y_train, y_test = split_rows(df, test_size, random_state)
+
+    pipeline = build_pipeline(n_estimators, max_depth, n_jobs, random_state, vocabulary)
+    search_score = None
+    if search_iter > 0:
+        with stage("search", timings):
+            best_params, search_score = search_hyperparameters(
+                X_train, y_train, search_iter, cv, n_jobs, random_state, vocabulary
+            )
+        pipeline.set_params(**best_params)
+
+    with stage("fit", timings):
+        pipeline.fit(X_train, y_train)
 
-    # Print R² score just for info
-    score = pipeline.score(X_test, y_test)
+    compact, metadata = score_and_export(pipeline, X_test, y_test, timings)
+    metadata["train_rows"] = len(X_train)
+    metadata["split"] = {"method": "rowid_hash" if "row_id" in df else "random", "test_size": test_size}
+    if search_score is not None:
+        metadata["search"] = {"iterations": search_iter, "cv": cv, "best_cv_r2": round(search_score, 4)}
+    return pipeline, compact, metadata
+
+def incremental_tree_count(forest, parent_train_rows, new_train_rows, max_trees):
+    """
+    Trees to add for `new_train_rows` rows. A forest averages its trees with
+    equal weight, so new trees get the new rows' share of all training rows
+    (as if the forest had been refitted on everything), capped at max_trees.
+    """
+    if parent_train_rows <= 0:
+        return max_trees
+    share = new_train_rows / (parent_train_rows + new_train_rows)
+    proportional = round(forest.n_estimators * share / (1 - share))
+    return max(1, min(max_trees, proportional))
+
+def incremental_train(pipeline, df, X_eval_old, y_eval_old, parent_train_rows, max_trees=50,
+                      n_jobs=-1, test_size=0.15, random_state=42, timings=None):
+    """
+    Grow an already-trained forest with new trees fitted only on `df` (rows
+    added since the parent version), via warm_start. The fitted
+    preprocessor is reused as-is so existing trees keep their feature
+    layout; categories first seen in `df` are encoded as unknown.
+
+    Scored on the held-out new rows plus older held-out rows
+    (X_eval_old/y_eval_old), next to the parent's score on the same rows.
+    """
+    timings = {} if timings is None else timings
+
+    with stage("preprocess", timings):
+        X_train, X_test, y_train, y_test = split_rows(df, test_size, random_state)
+        X_eval = pd.concat([X_test, X_eval_old], ignore_index=True)
+        y_eval = pd.concat([y_test, y_eval_old], ignore_index=True)
+        X_train_encoded = pipeline.named_steps["preprocessor"].transform(X_train)
+
+    forest = pipeline.named_steps["model"]
+    parent_score = pipeline.score(X_eval, y_eval)
+    extra_trees = incremental_tree_count(forest, parent_train_rows, len(X_train), max_trees)
+    print(f"Adding {extra_trees} tree(s) for {len(X_train)} new training rows")
+
+    with stage("fit", timings):
+        forest.set_params(warm_start=True, n_estimators=forest.n_estimators + extra_trees, n_jobs=n_jobs)
+        forest.fit(X_train_encoded, y_train)
+        forest.set_params(warm_start=False)
+
+    compact, metadata = score_and_export(pipeline, X_eval, y_eval, timings)
+    print(f"Parent R² on the same rows: {parent_score:.3f}")
+    metadata["train_rows"] = parent_train_rows + len(X_train)
+    metadata["split"] = {"method": "rowid_hash", "test_size": test_size}
+    metadata["incremental"] = {
+        "added_trees": extra_trees,
+        "new_train_rows": len(X_train),
+        "eval_rows": {"new": len(X_test), "old": len(X_eval_old)},
+        "parent_r2": round(float(parent_score), 4),
+    }
+    return pipeline, compact, metadata
+
+def score_and_export(pipeline, X_test, y_test, timings):
+    with stage("score", timings):
+        score = pipeline.score(X_test, y_test)
     print(f"Model R² score: {score:.3f}")
 
-    print("Saving model...")
-    joblib.dump(pipeline, MODEL_PATH)
+    # Serving predicts a handful of rows at a time; don't ship a forest that
+    # spins up a worker pool per call
+    pipeline.set_params(model__n_jobs=None)
+
+    with stage("export", timings):
+        compact = export_compact(pipeline, X_test)
+
+    model = pipeline.named_steps["model"]
+    metadata = {
+        "r2": round(float(score), 4),
+        "features": FEATURES,
+        "vocabulary_sizes": {col: len(cats) for col, cats in compact.vocabulary.items()},
+        "params": {
+            "n_estimators": model.n_estimators,
+            "max_depth": model.max_depth,
+            "min_samples_leaf": model.min_samples_leaf,
+            "max_features": model.max_features,
+        },
+    }
+    return compact, metadata
+
+def load_parent_version(registry_dir):
+    """Pipeline and metadata of the registry's ACTIVE version, the base for --incremental."""
+    registry = ModelRegistry(registry_dir)
+    version = registry.active_version()
+    if version is None:
+        raise SystemExit(f"--incremental needs an ACTIVE model version in {registry_dir}")
+    metadata = registry.metadata(version)
+    if metadata.get("source", {}).get("type") != "sqlite":
+        raise SystemExit(f"Version {version} was not trained from SQLite; run a full --db training first")
+    return version, joblib.load(registry.model_path(version)), metadata
+
+def export_compact(pipeline, X_check):
+    """
+    Compile the fitted pipeline into the array-backed format served by the
+    backend, and check it reproduces sklearn's predictions on X_check.
+    """
+    compact = export_pipeline(pipeline)
+    diff = float(np.max(np.abs(compact.predict(X_check) - pipeline.predict(X_check))))
+    if diff > EXPORT_TOLERANCE:
+        raise RuntimeError(f"Compact model differs from sklearn by {diff} (> {EXPORT_TOLERANCE})")
+    print(f"Compact model validated: max abs difference {diff:.2e} over {len(X_check)} rows")
+    return compact
+
+def save_model(pipeline, model_path=MODEL_PATH):
+    joblib.dump(pipeline, model_path)
+    print(f"Model saved to {Path(model_path).resolve()}")
+
+def register_model(pipeline, compact, metadata, registry_dir=REGISTRY_DIR, activate=True):
+    """
+    Write the model as a new version under registry_dir and (by default) mark
+    it ACTIVE; a running backend picks it up without a restart.
+    """
+    registry_dir = Path(registry_dir)
+    trained_at = datetime.now(timezone.utc)
+    version = trained_at.strftime("%Y%m%dT%H%M%S")
+    version_dir = registry_dir / version
+    version_dir.mkdir(parents=True, exist_ok=False)
+
+    joblib.dump(pipeline, version_dir / "model.pkl")
+    compact.save(version_dir / "model_compact")
+    # The category -> one-hot column vocabulary, readable without sklearn
+    (version_dir / "vocabulary.json").write_text(json.dumps(compact.vocabulary, indent=2))
+    metadata = {**metadata, "version": version, "trained_at": trained_at.isoformat()}
+    (version_dir / "metadata.json").write_text(json.dumps(metadata, indent=2))
+    print(f"Registered model version {version} in {registry_dir}")
+
+    if activate:
+        ModelRegistry(registry_dir).activate(version)
+        print(f"Activated model version {version}")
+    return version
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the service cost model")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="Training CSV")
+    parser.add_argument("--db", type=Path, help="Train from this SQLite database instead of --data")
+    parser.add_argument("--chunk-size", type=int, default=SQLITE_CHUNK_SIZE, help="Rows per SQLite read")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Add trees fitted only on rows inserted since the ACTIVE version (needs --db)")
+    parser.add_argument("--incremental-trees", type=int, default=50,
+                        help="Most trees --incremental adds (fewer for little new data)")
+    parser.add_argument("--min-new-rows", type=int, default=INCREMENTAL_MIN_ROWS,
+                        help="--incremental does nothing with fewer new rows than this")
+    parser.add_argument("--model-out", type=Path, default=MODEL_PATH, help="Where to write the pickled pipeline")
+    parser.add_argument("--registry", type=Path, default=REGISTRY_DIR, help="Model registry directory")
+    parser.add_argument("--no-register", action="store_true", help="Don't add the model to the registry")
+    parser.add_argument("--no-activate", action="store_true", help="Register without marking the version ACTIVE or writing --model-out")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores for fitting and search (-1 = all)")
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--max-depth", type=int, default=12)
+    parser.add_argument("--search", type=int, default=0, metavar="N",
+                        help="Run a randomized hyperparameter search over N candidates first")
+    parser.add_argument("--cv", type=int, default=3, help="Cross-validation folds for --search")
+    parser.add_argument("--test-size", type=float, default=0.15)
+    parser.add_argument("--random-state", type=int, default=42)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.incremental and args.db is None:
+        raise SystemExit("--incremental requires --db")
+    timings = {}
+
+    parent_version, parent, after_rowid = None, None, 0
+    if args.incremental:
+        parent_version, parent, parent_metadata = load_parent_version(args.registry)
+        after_rowid = parent_metadata["source"]["max_rowid"]
+        print(f"Incremental training on top of version {parent_version} (rows after rowid {after_rowid})")
+
+    with stage("load", timings):
+        if args.db is not None:
+            df, max_rowid = load_data_from_sqlite(args.db, args.chunk_size, after_rowid)
+            source = {"type": "sqlite", "db": str(args.db.resolve()), "max_rowid": max_rowid}
+        else:
+            df = load_data(args.data)
+            source = {"type": "csv", "path": str(args.data.resolve())}
+    print(f"Loaded {len(df)} rows ({df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
+    if df.empty:
+        print("No new rows to train on")
+        return
+
+    activate = not args.no_activate
+    if args.incremental:
+        if len(df) < args.min_new_rows:
+            print(f"Only {len(df)} new rows (< --min-new-rows {args.min_new_rows}); keeping version {parent_version}")
+            return
+        split = parent_metadata.get("split", {})
+        if split.get("method") != "rowid_hash":
+            print(f"Warning: version {parent_version} used a random split; older scoring rows may be training rows")
+        test_size = split.get("test_size", args.test_size)
+        eval_old = load_holdout_from_sqlite(args.db, after_rowid, test_size)
+        pipeline, compact, metadata = incremental_train(
+            parent,
+            df,
+            eval_old[FEATURES],
+            eval_old[TARGET],
+            parent_train_rows=parent_metadata.get("train_rows", 0),
+            max_trees=args.incremental_trees,
+            n_jobs=args.n_jobs,
+            test_size=test_size,
+            random_state=args.random_state,
+            timings=timings,
+        )
+        metadata["parent_version"] = parent_version
+        if metadata["r2"] < metadata["incremental"]["parent_r2"]:
+            print(f"Grown forest scores below version {parent_version}; registering without activating")
+            activate = False
+    else:
+        pipeline, compact, metadata = preprocess_and_train(
+            df,
+            n_jobs=args.n_jobs,
+            n_estimators=args.n_estimators,
+            max_depth=args.max_depth,
+            search_iter=args.search,
+            cv=args.cv,
+            test_size=args.test_size,
+            random_state=args.random_state,
+            timings=timings,
+        )
+    metadata["source"] = source
 
-    print(f"Model saved to {MODEL_PATH.resolve()}")
+    with stage("dump", timings):
+        # --model-out is the legacy path the backend serves without a registry;
+        # it must never get a model the registry didn't activate
+        if activate:
+            save_model(pipeline, args.model_out)
+        else:
+            print(f"Not activated; leaving {args.model_out} unchanged")
+        if not args.no_register:
+            register_model(pipeline, compact, {**metadata, "timings": timings},
+                           args.registry, activate=activate)
 
-def main():
-    df = load_data()
-    preprocess_and_train(df)
+    print("Stage timings: " + ", ".join(f"{name}={secs:.2f}s" for name, secs in timings.items()))
 
 if __name__ == "__main__":
     main()